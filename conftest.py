@@ -0,0 +1,37 @@
+import contextlib
+from unittest import mock
+
+import pytest
+
+
+@pytest.fixture
+def db_fake():
+    """Factory for a db_connection replacement with canned cursor results.
+
+    Returns a callable: db_fake(fetchone=..., fetchall=..., rowcount=...)
+    builds a context manager that yields a MagicMock connection whose
+    (single, reused) cursor answers fetchone/fetchall with the given
+    values. Tests plug it in with
+    monkeypatch.setattr(m, "db_connection", db_fake(fetchall=[...])),
+    instead of re-declaring FakeCursor/FakeConn boilerplate per test.
+    The connection and cursor are exposed as .conn / .cursor for
+    call-count assertions.
+    """
+
+    def _factory(fetchone=None, fetchall=None, rowcount=0):
+        conn = mock.MagicMock(name="fake_db_conn")
+        cursor = conn.cursor.return_value
+        cursor.connection = conn
+        cursor.fetchone.return_value = fetchone
+        cursor.fetchall.return_value = list(fetchall or [])
+        cursor.rowcount = rowcount
+
+        @contextlib.contextmanager
+        def fake_db_connection(commit=False):
+            yield conn
+
+        fake_db_connection.conn = conn
+        fake_db_connection.cursor = cursor
+        return fake_db_connection
+
+    return _factory
@@ -0,0 +1,40 @@
+"""Gunicorn config for the school-result app.
+
+Defaults mirror the previous Procfile flags (threaded sync workers, which
+suit blocking psycopg2). For IO-heavy deployments set
+GUNICORN_WORKER_CLASS=gevent — psycopg2 is then greenlet-patched per
+worker so DB waits yield instead of blocking the hub. gevent mode needs
+`pip install gevent psycogreen`.
+"""
+import os
+
+
+def _int_env(name, default):
+    try:
+        return int((os.environ.get(name, '') or '').strip() or default)
+    except (TypeError, ValueError):
+        return default
+
+
+worker_class = (os.environ.get('GUNICORN_WORKER_CLASS', '') or 'gthread').strip().lower()
+# Default stays at 1 worker (matching the previous Procfile) because the
+# in-process background worker disables itself when WEB_CONCURRENCY > 1.
+# Set WEB_CONCURRENCY explicitly to scale; 2*CPU+1 is the usual target.
+workers = _int_env('WEB_CONCURRENCY', 1)
+threads = _int_env('GUNICORN_THREADS', 2)
+worker_connections = _int_env('GUNICORN_WORKER_CONNECTIONS', 1000)
+keepalive = _int_env('GUNICORN_KEEPALIVE', 5)
+timeout = _int_env('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _int_env('GUNICORN_GRACEFUL_TIMEOUT', 30)
+max_requests = _int_env('GUNICORN_MAX_REQUESTS', 500)
+max_requests_jitter = _int_env('GUNICORN_MAX_REQUESTS_JITTER', 50)
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+            server.log.info("psycopg2 patched for gevent in worker %s", worker.pid)
+        except Exception as exc:
+            server.log.warning("Could not patch psycopg2 for gevent: %s", exc)
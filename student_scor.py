@@ -8,10 +8,12 @@ Author: OSondu Stanley
 Version: 2.1.0
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, Response, jsonify, g, has_request_context
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, Response, jsonify, g, has_request_context, stream_with_context
 from flask import got_request_exception
+from flask.sessions import SecureCookieSessionInterface, NullSession
 from flask_wtf.csrf import CSRFProtect, CSRFError
 import argparse
+import bisect
 import json
 import csv
 import re
@@ -35,16 +37,19 @@ import urllib.request
 import urllib.parse
 import base64
 import threading
+import queue
 import socket
 import sys
 from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import traceback
 
 import os
 import secrets
 import atexit
 from contextlib import contextmanager
-from functools import wraps
+from functools import lru_cache, wraps
 
 import logging
 from logging.handlers import RotatingFileHandler
@@ -60,6 +65,19 @@ try:
     import qrcode
 except Exception:
     qrcode = None
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+if orjson is not None:
+    def json_dumps_fast(obj):
+        """orjson-backed dumps for the student (de)serialization hot path."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    json_loads_fast = orjson.loads
+else:
+    json_dumps_fast = json.dumps
+    json_loads_fast = json.loads
 from services import parent_queries as parent_queries_service
 
 if load_dotenv:
@@ -280,6 +298,29 @@ if not secret_key:
 if not ALLOW_INSECURE_DEFAULTS and len(secret_key) < 32:
     raise RuntimeError("SECRET_KEY is too short. Use at least 32 characters in production.")
 app.secret_key = secret_key
+
+if orjson is not None:
+    from flask.json.provider import DefaultJSONProvider
+
+    class _OrjsonJSONProvider(DefaultJSONProvider):
+        """Route jsonify/tojson through orjson's C serializer.
+
+        Keeps DefaultJSONProvider.default as the fallback so dates,
+        Decimal and dataclasses still serialize the same way.
+        """
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_NON_STR_KEYS,
+            ).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = _OrjsonJSONProvider(app)
+
 app.config['WTF_CSRF_TIME_LIMIT'] = None
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
@@ -292,6 +333,37 @@ else:
     # Default secure in production, relaxed for explicit local/dev mode.
     app.config['SESSION_COOKIE_SECURE'] = not ALLOW_INSECURE_DEFAULTS
 
+class _StaticBypassSessionInterface(SecureCookieSessionInterface):
+    """Skip signed-cookie decode/verify for static asset requests.
+
+    Static files never read or write the session, so paying the HMAC
+    verification per CSS/JS/image request is wasted CPU.
+
+    A fully lazy session (decode deferred until first access) was
+    evaluated and rejected: Flask already returns an empty session
+    without any HMAC work when no cookie is present, and the
+    before_request identity snapshot reads the session on every
+    dynamic request, so a lazy proxy would be forced on first touch
+    anyway. The static bypass above is the only request class that
+    actually avoids the decode.
+    """
+
+    def __init__(self, static_url_path=None):
+        super().__init__()
+        self._static_prefix = (static_url_path or '/static') + '/'
+
+    def open_session(self, app, request):
+        if (request.path or '').startswith(self._static_prefix):
+            return self.make_null_session(app)
+        return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        if isinstance(session, NullSession):
+            return
+        super().save_session(app, session, response)
+
+app.session_interface = _StaticBypassSessionInterface(app.static_url_path)
+
 # Initialize CSRF Protection
 csrf = CSRFProtect(app)
 
@@ -4768,7 +4840,10 @@ def _runtime_schema_heal_allowed():
     env_enabled = os.environ.get('ALLOW_RUNTIME_SCHEMA_HEAL', '0').strip().lower() in ('1', 'true', 'yes')
     return bool(env_enabled and _SCHEMA_DDL_ALLOWED)
 
+@lru_cache(maxsize=1024)
 def _adapt_query(query):
+    # Statements are module literals, so the ?->%s rewrite is computed
+    # once per distinct statement for the life of the process.
     return query.replace('?', '%s')
 
 def _sanitize_db_log_params(query, params):
@@ -4830,6 +4905,37 @@ def db_execute(cursor, query, params=None):
         logging.error("Database Error: %s", e)
         raise
 
+def db_executemany(cursor, query, params_seq):
+    """Execute one statement over many parameter rows in a single dispatch."""
+    params_seq = list(params_seq)
+    if not params_seq:
+        return
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(
+            "db_executemany: %s | rows=%s",
+            query.strip().replace('\n', ' '),
+            len(params_seq),
+        )
+    try:
+        cursor.executemany(_adapt_query(query), params_seq)
+        try:
+            conn = getattr(cursor, 'connection', None)
+            # Keep psycopg transaction behavior managed by db_connection(commit=...).
+            # For lightweight/dummy cursors (tests/tools), commit per statement.
+            if conn is not None and not hasattr(conn, 'get_transaction_status') and hasattr(conn, 'commit'):
+                conn.commit()
+        except Exception as exc:
+            _log_suppressed_exception('db_executemany', exc)
+    except Exception as e:
+        try:
+            # Keep connection usable when callers catch errors and continue.
+            if getattr(cursor, 'connection', None):
+                cursor.connection.rollback()
+        except Exception as exc:
+            _log_suppressed_exception('db_executemany', exc)
+        logging.error("Database Error: %s", e)
+        raise
+
 def _is_transient_db_transport_error(exc):
     """Best-effort detection of short-lived DB transport errors (SSL/socket drops)."""
     text = (str(exc) or '').strip().lower()
@@ -4850,8 +4956,13 @@ def _is_transient_db_transport_error(exc):
     )
     return any(m in text for m in markers)
 
+@lru_cache(maxsize=1024)
 def canonicalize_classname(value):
-    """Canonical class key used for shared subject catalog (e.g. 'JSS 1' -> 'JSS1')."""
+    """Canonical class key used for shared subject catalog (e.g. 'JSS 1' -> 'JSS1').
+
+    Memoized: class tokens repeat constantly across requests and the alias
+    rules below involve several regex passes.
+    """
     cleaned = re.sub(r'[^A-Za-z0-9]+', '', (value or '').strip()).upper()
     if not cleaned:
         return ''
@@ -5113,8 +5224,8 @@ def build_result_verification_context(school_id, student_id, term, academic_year
         'verification_qr_url': qr_image_url,
     }
 
-def _catalog_defaults_for_class(classname_key):
-    key = canonicalize_classname(classname_key)
+@lru_cache(maxsize=8)
+def _catalog_defaults_for_level(is_senior):
     jss_core = [
         'English Language', 'Mathematics', 'Basic Science', 'Basic Technology',
         'Civic Education', 'Social Studies', 'Christian Religious Studies',
@@ -5127,13 +5238,18 @@ def _catalog_defaults_for_class(classname_key):
     ss_commercial = ['Financial Accounting', 'Commerce', 'Economics']
     ss_optional = ['Data Processing', 'Agricultural Science', 'French', 'Further Mathematics']
 
-    if key.startswith('JSS'):
-        return {'core': jss_core, 'science': [], 'art': [], 'commercial': [], 'optional': []}
-    if key.startswith('SS') or key.startswith('SSS'):
+    if is_senior:
         return {'core': ss_core, 'science': ss_science, 'art': ss_art, 'commercial': ss_commercial, 'optional': ss_optional}
-    # Fallback for unknown class names.
+    # Junior classes; also the fallback for unknown class names.
     return {'core': jss_core, 'science': [], 'art': [], 'commercial': [], 'optional': []}
 
+def _catalog_defaults_for_class(classname_key):
+    key = canonicalize_classname(classname_key)
+    cached = _catalog_defaults_for_level(key.startswith('SS') or key.startswith('SSS'))
+    # Hand out fresh lists so call sites can extend them without touching
+    # the cached catalog.
+    return {bucket: list(subjects) for bucket, subjects in cached.items()}
+
 def _upsert_global_catalog_subject_with_cursor(c, classname_key, bucket, subject_name):
     raw = ' '.join((subject_name or '').strip().split())
     if not raw:
@@ -5196,8 +5312,12 @@ def _get_db_pool():
         from psycopg2.extras import DictCursor
     except ImportError as exc:
         raise RuntimeError("PostgreSQL backend requires psycopg2-binary") from exc
-    min_conn = max(2, int(os.environ.get('DB_POOL_MIN_CONN', '2') or 2))
-    max_conn = max(min_conn, int(os.environ.get('DB_POOL_MAX_CONN', '20') or 20))
+    # DB_POOL_*_CONN are the canonical knobs; PG_POOL_MIN/MAX are accepted
+    # as aliases for parity with common deployment templates.
+    min_raw = os.environ.get('DB_POOL_MIN_CONN') or os.environ.get('PG_POOL_MIN') or '2'
+    max_raw = os.environ.get('DB_POOL_MAX_CONN') or os.environ.get('PG_POOL_MAX') or '20'
+    min_conn = max(2, int(min_raw or 2))
+    max_conn = max(min_conn, int(max_raw or 20))
     _DB_POOL = pool.ThreadedConnectionPool(
         minconn=min_conn,
         maxconn=max_conn,
@@ -5212,6 +5332,45 @@ def _get_db_pool():
     )
     return _DB_POOL
 
+def warm_db_pool():
+    """Open and ping the pool's minimum connections so the first request
+    burst after boot does not pay TCP/TLS/auth handshakes."""
+    try:
+        pool = _get_db_pool()
+    except Exception as exc:
+        logging.warning("DB pool warm-up skipped (pool unavailable): %s", exc)
+        return 0
+    conns = []
+    try:
+        for _ in range(max(1, int(getattr(pool, 'minconn', 1) or 1))):
+            try:
+                conns.append(pool.getconn())
+            except Exception:
+                break
+
+        def _ping(conn):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute('SELECT 1')
+                    cur.fetchone()
+                return True
+            except Exception as exc:
+                logging.warning("DB pool warm-up ping failed: %s", exc)
+                return False
+
+        # Ping concurrently: each held connection completes its first
+        # round-trip in parallel rather than serially at boot.
+        with ThreadPoolExecutor(max_workers=max(1, len(conns))) as executor:
+            warmed = sum(1 for ok in executor.map(_ping, conns) if ok)
+    finally:
+        for conn in conns:
+            try:
+                pool.putconn(conn)
+            except Exception as put_exc:
+                logging.warning("DB pool warm-up putconn failed: %s", put_exc)
+    logging.info("DB pool warm-up completed: %s connection(s) ready.", warmed)
+    return warmed
+
 def _close_db_pool():
     global _DB_POOL
     if _DB_POOL is not None:
@@ -5222,7 +5381,14 @@ atexit.register(_close_db_pool)
 
 @contextmanager
 def db_connection(commit=False):
-    """Context manager for PostgreSQL pooled connections with optional commit."""
+    """Context manager for PostgreSQL pooled connections with optional commit.
+
+    Cursors are deliberately created per use rather than cached on the
+    pooled connection: psycopg2 client-side cursors are plain Python
+    objects (no server portal), some blocks open several cursors at
+    once, and a cursor carrying pending results across requests would
+    be a correctness hazard for no measurable saving.
+    """
     pool = _get_db_pool()
     conn = pool.getconn()
     discard_conn = False
@@ -7830,20 +7996,17 @@ def format_timestamp(ts):
 
 def save_student_with_cursor(c, school_id, student_id, student_data, school_for_stream=None):
     """Save one student using an existing DB cursor/transaction."""
+    save_students_with_cursor(c, school_id, {student_id: student_data}, school_for_stream=school_for_stream)
+
+def save_students_with_cursor(c, school_id, students_by_id, school_for_stream=None):
+    """Save many students in one batched upsert using an existing cursor/transaction."""
     school_key = _normalize_school_id_text(school_id)
     if not school_key:
         raise ValueError('School ID is required.')
     school_id = school_key
-    logging.info(f"save_student_with_cursor called: school_id={school_id}, student_id={student_id}")
-    firstname = normalize_person_name(student_data.get('firstname', ''))
-    email = (student_data.get('email') or student_data.get('student_email') or '').strip().lower()
-    if email and not is_valid_email(email):
-        email = ''
-    subjects = _dedupe_keep_order([normalize_subject_name(s) for s in (student_data.get('subjects', []) or []) if s])
-    subjects_str = json.dumps(subjects)
-    scores_str = json.dumps(student_data.get('scores', {}))
-    term = student_data.get('term', 'First Term')
-    classname_for_stream = student_data.get('classname', '')
+    if not students_by_id:
+        return
+    logging.info(f"save_students_with_cursor called: school_id={school_id}, students={len(students_by_id)}")
     school_ctx = school_for_stream if isinstance(school_for_stream, dict) else {}
     if not school_ctx:
         # Use the same transaction cursor for stream-mode lookup to avoid
@@ -7863,39 +8026,32 @@ def save_student_with_cursor(c, school_id, student_id, student_data, school_for_
                 school_ctx = {'ss1_stream_mode': (mode or 'separate')}
         except Exception:
             school_ctx = {}
-    stream_input = student_data.get('stream', 'N/A')
-    stream, stream_error = normalize_stream_for_class(
-        classname_for_stream,
-        stream_input,
-        school=school_ctx,
-    )
-    if stream_error:
-        # Keep invalid/legacy stream data from forcing a wrong default.
-        stream = 'N/A'
-    first_year_class = student_data.get('first_year_class', student_data.get('classname', ''))
-    number_of_subject = len(subjects)
-    date_of_birth = (student_data.get('date_of_birth', '') or '').strip()
-    gender = normalize_student_gender(student_data.get('gender', ''))
-    student_phone = (student_data.get('student_phone') or student_data.get('phone') or '').strip()
-    parent_phone = (student_data.get('parent_phone', '') or '').strip()
-    parent_password_hash = (student_data.get('parent_password_hash', '') or '').strip()
-    parent_name = normalize_person_name(student_data.get('parent_name', ''))
-    parent_gender = normalize_parent_gender(student_data.get('parent_gender', ''))
-    parent_name_2 = normalize_person_name(student_data.get('parent_name_2', ''))
-    parent_phone_2 = (student_data.get('parent_phone_2', '') or '').strip()
-    parent_password_hash_2 = (student_data.get('parent_password_hash_2', '') or '').strip()
-    parent_gender_2 = normalize_parent_gender(student_data.get('parent_gender_2', ''))
+
     has_parent_cols = students_has_parent_access_columns()
     has_parent_multi_cols = students_has_parent_multi_access_columns()
     has_email_col = students_has_email_column()
-    promoted_value = normalize_promoted_db_value(student_data.get('promoted', 0))
     has_phone_col = students_has_phone_column()
+    has_user_id_col = students_has_user_id_column()
+
+    student_ids = [sid for sid in students_by_id.keys() if sid]
+    db_execute(
+        c,
+        """SELECT student_id
+           FROM students
+           WHERE school_id = ? AND student_id = ANY(?)""",
+        (school_id, student_ids),
+    )
+    existing_ids = {(row['student_id'] if hasattr(row, 'keys') else row[0]) for row in (c.fetchall() or [])}
+    new_students = sum(1 for sid in student_ids if sid not in existing_ids)
+    if new_students:
+        ensure_school_plan_capacity(school_id, add_students=new_students, add_teachers=0)
+
+    # Column layout is identical for every student, so the SQL is built once
+    # and the per-student work below only assembles parameter rows.
     email_insert_col = ", email" if has_email_col else ""
     email_update_col = " email = excluded.email," if has_email_col else ""
-    email_value = [email] if has_email_col else []
     phone_insert_col = ", student_phone" if has_phone_col else ""
     phone_update_col = " student_phone = excluded.student_phone," if has_phone_col else ""
-    phone_value = [student_phone] if has_phone_col else []
     if has_parent_cols:
         if has_parent_multi_cols:
             parent_insert_cols = ", parent_phone, parent_password_hash, parent_name, parent_gender, parent_name_2, parent_phone_2, parent_password_hash_2, parent_gender_2"
@@ -7908,36 +8064,85 @@ def save_student_with_cursor(c, school_id, student_id, student_data, school_for_
                      parent_phone_2 = excluded.parent_phone_2,
                      parent_password_hash_2 = excluded.parent_password_hash_2,
                      parent_gender_2 = excluded.parent_gender_2,"""
-            parent_values = [parent_phone, parent_password_hash, parent_name, parent_gender, parent_name_2, parent_phone_2, parent_password_hash_2, parent_gender_2]
             parent_placeholders = ", ?, ?, ?, ?, ?, ?, ?, ?"
         else:
             parent_insert_cols = ", parent_phone, parent_password_hash"
             parent_update_cols = """
                      parent_phone = excluded.parent_phone,
                      parent_password_hash = excluded.parent_password_hash,"""
-            parent_values = [parent_phone, parent_password_hash]
             parent_placeholders = ", ?, ?"
     else:
         parent_insert_cols = ""
         parent_update_cols = ""
-        parent_values = []
         parent_placeholders = ""
 
-    db_execute(
-        c,
-        """SELECT 1
-           FROM students
-           WHERE school_id = ? AND student_id = ?
-           LIMIT 1""",
-        (school_id, student_id),
-    )
-    existing_student = bool(c.fetchone())
-    if not existing_student:
-        ensure_school_plan_capacity(school_id, add_students=1, add_teachers=0)
+    payload = []
+    for student_id, student_data in students_by_id.items():
+        firstname = normalize_person_name(student_data.get('firstname', ''))
+        email = (student_data.get('email') or student_data.get('student_email') or '').strip().lower()
+        if email and not is_valid_email(email):
+            email = ''
+        subjects = _dedupe_keep_order([normalize_subject_name(s) for s in (student_data.get('subjects', []) or []) if s])
+        subjects_str = json_dumps_fast(subjects)
+        scores_str = json_dumps_fast(student_data.get('scores', {}))
+        term = student_data.get('term', 'First Term')
+        classname_for_stream = student_data.get('classname', '')
+        stream_input = student_data.get('stream', 'N/A')
+        stream, stream_error = normalize_stream_for_class(
+            classname_for_stream,
+            stream_input,
+            school=school_ctx,
+        )
+        if stream_error:
+            # Keep invalid/legacy stream data from forcing a wrong default.
+            stream = 'N/A'
+        first_year_class = student_data.get('first_year_class', student_data.get('classname', ''))
+        number_of_subject = len(subjects)
+        date_of_birth = (student_data.get('date_of_birth', '') or '').strip()
+        gender = normalize_student_gender(student_data.get('gender', ''))
+        student_phone = (student_data.get('student_phone') or student_data.get('phone') or '').strip()
+        parent_phone = (student_data.get('parent_phone', '') or '').strip()
+        parent_password_hash = (student_data.get('parent_password_hash', '') or '').strip()
+        parent_name = normalize_person_name(student_data.get('parent_name', ''))
+        parent_gender = normalize_parent_gender(student_data.get('parent_gender', ''))
+        parent_name_2 = normalize_person_name(student_data.get('parent_name_2', ''))
+        parent_phone_2 = (student_data.get('parent_phone_2', '') or '').strip()
+        parent_password_hash_2 = (student_data.get('parent_password_hash_2', '') or '').strip()
+        parent_gender_2 = normalize_parent_gender(student_data.get('parent_gender_2', ''))
+        promoted_value = normalize_promoted_db_value(student_data.get('promoted', 0))
+        email_value = [email] if has_email_col else []
+        phone_value = [student_phone] if has_phone_col else []
+        if has_parent_cols:
+            if has_parent_multi_cols:
+                parent_values = [parent_phone, parent_password_hash, parent_name, parent_gender, parent_name_2, parent_phone_2, parent_password_hash_2, parent_gender_2]
+            else:
+                parent_values = [parent_phone, parent_password_hash]
+        else:
+            parent_values = []
 
-    if students_has_user_id_column():
-        user_id = student_id
-        db_execute(
+        row_values = [
+            school_id,
+            student_id,
+            firstname,
+        ] + email_value + [
+            date_of_birth,
+            gender,
+            student_data['classname'],
+            first_year_class,
+            term,
+            stream,
+            number_of_subject,
+            subjects_str,
+            scores_str,
+            promoted_value,
+        ] + phone_value + parent_values
+        if has_user_id_col:
+            # user_id mirrors student_id for login linkage.
+            row_values = [student_id] + row_values
+        payload.append(row_values)
+
+    if has_user_id_col:
+        db_executemany(
             c,
             f"""INSERT INTO students
                    (user_id, school_id, student_id, firstname{email_insert_col}, date_of_birth, gender, classname, first_year_class, term, stream,
@@ -7958,26 +8163,10 @@ def save_student_with_cursor(c, school_id, student_id, student_data, school_for_
                      scores = excluded.scores,
                      promoted = excluded.promoted,{parent_update_cols}
                      student_id = excluded.student_id""",
-            [
-                user_id,
-                school_id,
-                student_id,
-                firstname,
-            ] + email_value + [
-                date_of_birth,
-                gender,
-                student_data['classname'],
-                first_year_class,
-                term,
-                stream,
-                number_of_subject,
-                subjects_str,
-                scores_str,
-                promoted_value,
-            ] + phone_value + parent_values,
+            payload,
         )
     else:
-        db_execute(
+        db_executemany(
             c,
             f"""INSERT INTO students
                    (school_id, student_id, firstname{email_insert_col}, date_of_birth, gender, classname, first_year_class, term, stream,
@@ -7997,24 +8186,8 @@ def save_student_with_cursor(c, school_id, student_id, student_data, school_for_
                      subjects = excluded.subjects,
                      scores = excluded.scores,
                      promoted = excluded.promoted{(',' + parent_update_cols) if parent_update_cols else ''}""",
-            [
-                school_id,
-                student_id,
-                firstname,
-            ] + email_value + [
-                date_of_birth,
-                gender,
-                student_data['classname'],
-                first_year_class,
-                term,
-                stream,
-                number_of_subject,
-                subjects_str,
-                scores_str,
-                promoted_value,
-            ] + phone_value + parent_values,
+            payload,
         )
-
 def _normalize_score_block_for_audit(score_block):
     if not isinstance(score_block, dict):
         return {}
@@ -8232,7 +8405,7 @@ def audit_student_score_changes_with_cursor(
 
 def _safe_json_object(raw_value):
     try:
-        value = json.loads(raw_value) if raw_value else {}
+        value = json_loads_fast(raw_value) if raw_value else {}
     except Exception:
         value = {}
     return value if isinstance(value, dict) else {}
@@ -9273,8 +9446,10 @@ def normalize_parent_gender(value):
         return 'Female'
     return ''
 
+@lru_cache(maxsize=4096)
 def normalize_subject_name(value):
-    """Normalize subject names with leading-cap style."""
+    """Normalize subject names with leading-cap style (memoized; subject
+    names repeat heavily across rows and classes)."""
     text = ' '.join((value or '').strip().split())
     if not text:
         return ''
@@ -9318,15 +9493,30 @@ def normalize_subjects_list(items):
         items = [s for s in items.split(',')]
     return _dedupe_keep_order([normalize_subject_name(str(s).strip()) for s in (items or []) if str(s).strip()])
 
+# Subject bucket keys as stored in class subject configs and in the catalog
+# defaults respectively.
+_CONFIG_SUBJECT_BUCKETS = ('core_subjects', 'science_subjects', 'art_subjects', 'commercial_subjects', 'optional_subjects')
+_CATALOG_SUBJECT_BUCKETS = ('core', 'science', 'art', 'commercial', 'optional')
+
+def _iter_config_subjects(config):
+    """Iterate subjects across all buckets of a class config, no intermediate lists."""
+    config = config or {}
+    return chain.from_iterable(config.get(key) or () for key in _CONFIG_SUBJECT_BUCKETS)
+
+def _iter_catalog_subjects(defaults):
+    """Iterate subjects across all buckets of a catalog defaults dict."""
+    defaults = defaults or {}
+    return chain.from_iterable(defaults.get(key) or () for key in _CATALOG_SUBJECT_BUCKETS)
+
 def _dedupe_keep_order(items):
-    seen = set()
-    out = []
+    # Insertion-ordered dict doubles as the seen-set, so one hash table
+    # replaces the separate set + list while keeping first-wins order.
+    out = {}
     for item in items:
-        key = item.strip().lower()
-        if key and key not in seen:
-            seen.add(key)
-            out.append(item.strip())
-    return out
+        stripped = item.strip()
+        if stripped:
+            out.setdefault(stripped.lower(), stripped)
+    return list(out.values())
 
 def get_class_subject_config(school_id, classname):
     """Fetch class subject config for a school/class."""
@@ -10139,14 +10329,7 @@ def _next_cbt_identifier_with_cursor(c, table_name, column_name, prefix):
 
 
 def _cbt_collect_subjects_for_class_config(config):
-    config = config or {}
-    values = (
-        (config.get('core_subjects') or [])
-        + (config.get('science_subjects') or [])
-        + (config.get('art_subjects') or [])
-        + (config.get('commercial_subjects') or [])
-        + (config.get('optional_subjects') or [])
-    )
+    values = _iter_config_subjects(config)
     return _dedupe_keep_order([normalize_subject_name(item) for item in values if str(item).strip()])
 
 
@@ -11302,6 +11485,20 @@ def _default_assessment_config(level):
 def get_assessment_config(school_id, level):
     """Get one assessment config for level."""
     level = (level or 'jss').strip().lower()
+
+    # Assessment configs do not change mid-request, so reuse one lookup per
+    # (school, level) for the request lifetime (same pattern as get_school).
+    request_cache = None
+    cache_key = (school_id, level)
+    if has_request_context():
+        request_cache = getattr(g, '_assessment_config_cache', None)
+        if request_cache is None:
+            request_cache = {}
+            setattr(g, '_assessment_config_cache', request_cache)
+        cached = request_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
     with db_connection() as conn:
         c = conn.cursor()
         db_execute(
@@ -11315,14 +11512,18 @@ def get_assessment_config(school_id, level):
         row = c.fetchone()
 
     if not row:
-        return {'level': level, **_default_assessment_config(level)}
-    return {
-        'level': level,
-        'exam_mode': row[0] if row[0] in ('separate', 'combined') else 'separate',
-        'objective_max': int(row[1] or 0),
-        'theory_max': int(row[2] or 0),
-        'exam_score_max': int(row[3] or 0),
-    }
+        config = {'level': level, **_default_assessment_config(level)}
+    else:
+        config = {
+            'level': level,
+            'exam_mode': row[0] if row[0] in ('separate', 'combined') else 'separate',
+            'objective_max': int(row[1] or 0),
+            'theory_max': int(row[2] or 0),
+            'exam_score_max': int(row[3] or 0),
+        }
+    if request_cache is not None:
+        request_cache[cache_key] = dict(config)
+    return config
 
 def get_assessment_config_for_class(school_id, classname):
     """Resolve assessment config using class name."""
@@ -11364,11 +11565,20 @@ def save_assessment_config(school_id, level, exam_mode, objective_max, theory_ma
         c = conn.cursor()
         save_assessment_config_with_cursor(c, school_id, level, exam_mode, objective_max, theory_max, exam_score_max)
 
-def build_subject_key_map(subjects):
-    """Build stable form keys for subject names."""
+@lru_cache(maxsize=1024)
+def _sorted_subjects_cached(subjects_tuple):
+    return tuple(sorted(subjects_tuple, key=lambda x: str(x).lower()))
+
+def sorted_subjects(subjects):
+    """Case-insensitive subject sort, memoized per subject tuple."""
+    return list(_sorted_subjects_cached(tuple(subjects or ())))
+
+@lru_cache(maxsize=256)
+def _build_subject_key_map_cached(subjects_tuple):
+    """Build stable form keys for a tuple of subject names."""
     key_map = {}
     seen = set()
-    for index, subject in enumerate(subjects):
+    for index, subject in enumerate(subjects_tuple):
         base = re.sub(r'[^A-Za-z0-9]+', '_', subject).strip('_').lower() or f"subject_{index+1}"
         key = base
         suffix = 2
@@ -11379,49 +11589,64 @@ def build_subject_key_map(subjects):
         key_map[subject] = key
     return key_map
 
+def build_subject_key_map(subjects):
+    """Build stable form keys for subject names (memoized per subject list)."""
+    return dict(_build_subject_key_map_cached(tuple(subjects)))
+
 def calculate_positions(students_list, ss_ranking_mode='together', school=None):
     """Calculate class positions, with optional SS stream-separated ranking."""
-    def same_score(a, b):
-        return abs(float(a or 0) - float(b or 0)) <= 1e-9
-
     positions = {}
     class_groups = {}
-    class_arm_mode = ((school or {}).get('class_arm_ranking_mode') or 'separate').strip().lower()
+    school = school or {}
+    class_arm_mode = (school.get('class_arm_ranking_mode') or 'separate').strip().lower()
     if class_arm_mode not in {'separate', 'together'}:
         class_arm_mode = 'separate'
+    separate_ss = ss_ranking_mode == 'separate'
+
+    # Extract each student's ranking fields into a plain tuple up front; the
+    # sort and the position walk below then avoid repeated dict lookups.
+    # Group/stream decisions depend only on the class name, so cache them.
+    class_traits = {}
     for student in students_list:
         class_name = student.get('class_name', '')
         term = student.get('term', '')
-        stream = (student.get('stream') or '').strip()
-        class_group = class_arm_ranking_group(class_name, class_arm_mode)
-        rank_key = f"{class_group}__{term}"
-        if ss_ranking_mode == 'separate' and class_uses_stream_for_school(school or {}, class_name):
-            rank_key = f"{class_group}__{term}__{stream or 'Unassigned'}"
-        if rank_key not in class_groups:
-            class_groups[rank_key] = []
-        class_groups[rank_key].append(student)
-
-    for rank_key, class_students in class_groups.items():
-        sorted_students = sorted(
-            class_students,
-            key=lambda x: safe_float(x.get('average_marks', 0), 0),
-            reverse=True,
-        )
+        traits = class_traits.get(class_name)
+        if traits is None:
+            traits = (
+                class_arm_ranking_group(class_name, class_arm_mode),
+                separate_ss and class_uses_stream_for_school(school, class_name),
+            )
+            class_traits[class_name] = traits
+        class_group, stream_ranked = traits
+        stream = student.get('stream', '')
+        if stream_ranked:
+            rank_key = f"{class_group}__{term}__{(stream or '').strip() or 'Unassigned'}"
+        else:
+            rank_key = f"{class_group}__{term}"
+        class_groups.setdefault(rank_key, []).append((
+            safe_float(student.get('average_marks', 0), 0),
+            student.get('student_id'),
+            class_name,
+            term,
+            stream,
+        ))
+
+    for rank_key, rows in class_groups.items():
+        rows.sort(key=lambda r: r[0], reverse=True)
+        size = len(rows)
         prev_score = None
         current_pos = 0
-        for index, student in enumerate(sorted_students, 1):
-            sid = student.get('student_id')
+        for index, (score, sid, class_name, term, stream) in enumerate(rows, 1):
             if not sid:
                 continue
-            score = float(student.get('average_marks', 0) or 0)
-            if prev_score is None or not same_score(score, prev_score):
+            if prev_score is None or abs(score - prev_score) > 1e-9:
                 current_pos = index
             positions[sid] = {
                 'pos': current_pos,
-                'size': len(sorted_students),
-                'class': student.get('class_name', ''),
-                'term': student.get('term', ''),
-                'stream': student.get('stream', ''),
+                'size': size,
+                'class': class_name,
+                'term': term,
+                'stream': stream,
                 'group': rank_key
             }
             prev_score = score
@@ -15263,23 +15488,29 @@ def get_grade_config(school_id):
         'pass_mark': pass_mark,
     }
 
-def grade_from_score(score, cfg):
-    """Get letter grade from score."""
-    score = float(score or 0)
+@lru_cache(maxsize=128)
+def _grade_lookup_cached(a, b, c, d):
+    # Keep thresholds monotonic (same clamping as get_grade_config) so the
+    # bisect below stays well-defined on corrupted configs.
+    a = max(a, b, c, d)
+    b = min(b, a)
+    c = min(c, b)
+    d = min(d, c)
+    return ((d, c, b, a), ('F', 'D', 'C', 'B', 'A'))
+
+def build_grade_lookup(cfg):
+    """Ascending grade thresholds + letters for bisect-based grading."""
     cfg = cfg or {}
     a = safe_float(cfg.get('a', cfg.get('grade_a_min', 70)), 70)
     b = safe_float(cfg.get('b', cfg.get('grade_b_min', 60)), 60)
     c = safe_float(cfg.get('c', cfg.get('grade_c_min', 50)), 50)
     d = safe_float(cfg.get('d', cfg.get('grade_d_min', 40)), 40)
-    if score >= a:
-        return 'A'
-    if score >= b:
-        return 'B'
-    if score >= c:
-        return 'C'
-    if score >= d:
-        return 'D'
-    return 'F'
+    return _grade_lookup_cached(a, b, c, d)
+
+def grade_from_score(score, cfg):
+    """Get letter grade from score."""
+    thresholds, letters = build_grade_lookup(cfg)
+    return letters[bisect.bisect_right(thresholds, float(score or 0))]
 
 def status_from_score(score, cfg):
     """Get pass/fail status from score."""
@@ -19278,6 +19509,15 @@ def pick_default_published_term(published_terms, current_term, current_year):
         return preferred
     return terms[-1]
 
+def _neighbor_terms(published_terms, token):
+    """Locate token in published_terms and return (index, prev, next) entries."""
+    terms = published_terms or []
+    token_index = {item['token']: i for i, item in enumerate(terms)}
+    current_index = token_index.get(token, 0)
+    prev_entry = terms[current_index - 1] if current_index > 0 else None
+    next_entry = terms[current_index + 1] if current_index < len(terms) - 1 else None
+    return current_index, prev_entry, next_entry
+
 def resolve_requested_published_term(published_terms, requested_term, current_term='', current_year=''):
     """
     Resolve one requested term selector against published terms.
@@ -19345,15 +19585,18 @@ def detect_max_tests_from_scores(scores, default_max_tests=3):
     return max_seen if max_seen > 0 else fallback
 
 
+_isfinite = math.isfinite  # bound once; the validators below run per subject per row
+
+
 def _is_finite_number_like(value):
     if isinstance(value, (int, float)):
-        return math.isfinite(float(value))
+        return _isfinite(float(value))
     if isinstance(value, str):
         text = value.strip()
         if not text:
             return False
         try:
-            return math.isfinite(float(text))
+            return _isfinite(float(text))
         except (TypeError, ValueError):
             return False
     return False
@@ -19380,7 +19623,7 @@ def parse_score_entry_number(raw_value, label='Score'):
         value = float(text)
     except (TypeError, ValueError):
         raise ValueError(f'Invalid {label}.')
-    if not math.isfinite(value):
+    if not _isfinite(value):
         raise ValueError(f'Invalid {label}.')
     return value
 
@@ -20319,18 +20562,38 @@ def review_result_approval_request(school_id, classname, term, academic_year, ad
         )
     return True, 'Submission rejected. Teacher can update and resubmit.'
 
+def get_published_classes_for_student(school_id, student_id):
+    """Sorted distinct classnames with published results for one student.
+
+    Reuses the per-request published-terms cache, so calling this alongside
+    get_published_terms_for_student costs no extra query.
+    """
+    seen = set()
+    classes = []
+    for t in get_published_terms_for_student(school_id, student_id):
+        name = (t.get('classname') or '').strip()
+        if name and name not in seen:
+            seen.add(name)
+            classes.append(name)
+    classes.sort()
+    return classes
+
 def get_published_terms_for_student(school_id, student_id, classname=''):
-    with db_connection() as conn:
-        c = conn.cursor()
-        if classname:
-            db_execute(
-                c,
-                """SELECT academic_year, term, classname, published_at FROM published_student_results
-                   WHERE school_id = ? AND student_id = ? AND LOWER(classname) = LOWER(?)
-                   ORDER BY published_at ASC""",
-                (school_id, student_id, classname),
-            )
-        else:
+    # Routes often call this twice back-to-back (unfiltered, then filtered by
+    # class). Fetch the unfiltered list once per request and filter in Python.
+    cache_key = (school_id, student_id)
+    terms = None
+    request_cache = None
+    if has_request_context():
+        request_cache = getattr(g, '_published_terms_cache', None)
+        if request_cache is None:
+            request_cache = {}
+            setattr(g, '_published_terms_cache', request_cache)
+        terms = request_cache.get(cache_key)
+
+    if terms is None:
+        with db_connection() as conn:
+            c = conn.cursor()
             db_execute(
                 c,
                 """SELECT academic_year, term, classname, published_at FROM published_student_results
@@ -20338,27 +20601,33 @@ def get_published_terms_for_student(school_id, student_id, classname=''):
                    ORDER BY published_at ASC""",
                 (school_id, student_id),
             )
-        rows = c.fetchall()
-    terms = []
-    seen = set()
-    for row in rows:
-        academic_year = row[0] or ''
-        term = row[1] or ''
-        row_classname = row[2] or ''
-        token = _term_token(academic_year, term)
-        seen_key = (token, (row_classname or '').strip().lower())
-        if seen_key in seen:
-            continue
-        seen.add(seen_key)
-        label = f"{term} ({academic_year})" if academic_year else term
-        terms.append({
-            'academic_year': academic_year,
-            'term': term,
-            'classname': row_classname,
-            'token': token,
-            'label': label,
-        })
-    return terms
+            rows = c.fetchall()
+        terms = []
+        seen = set()
+        for row in rows:
+            academic_year = row[0] or ''
+            term = row[1] or ''
+            row_classname = row[2] or ''
+            token = _term_token(academic_year, term)
+            seen_key = (token, (row_classname or '').strip().lower())
+            if seen_key in seen:
+                continue
+            seen.add(seen_key)
+            label = f"{term} ({academic_year})" if academic_year else term
+            terms.append({
+                'academic_year': academic_year,
+                'term': term,
+                'classname': row_classname,
+                'token': token,
+                'label': label,
+            })
+        if request_cache is not None:
+            request_cache[cache_key] = terms
+
+    class_key = (classname or '').strip().lower()
+    if class_key:
+        return [dict(t) for t in terms if (t.get('classname') or '').strip().lower() == class_key]
+    return [dict(t) for t in terms]
 
 def get_published_overview_for_students(school_id, student_ids):
     return parent_queries_service.get_published_overview_for_students(
@@ -20617,24 +20886,70 @@ def get_published_students_for_class(school_id, classname, term, academic_year='
         })
     return out
 
+_RESULT_VIEW_UPSERT_SQL = """INSERT INTO result_views
+               (school_id, student_id, term, academic_year, first_viewed_at, last_viewed_at, view_count)
+               VALUES (?, ?, ?, ?, ?, ?, 1)
+               ON CONFLICT(school_id, student_id, term, academic_year) DO UPDATE SET
+                 last_viewed_at = excluded.last_viewed_at,
+                 view_count = result_views.view_count + 1"""
+_RESULT_VIEW_QUEUE = queue.Queue(maxsize=10000)
+_RESULT_VIEW_FLUSH_SECONDS = 2.0
+_RESULT_VIEW_FLUSH_BATCH = 200
+_RESULT_VIEW_WORKER_STARTED = False
+_RESULT_VIEW_WORKER_LOCK = threading.Lock()
+
+def _flush_result_views(entries):
+    if not entries:
+        return
+    try:
+        with db_connection(commit=True) as conn:
+            c = conn.cursor()
+            db_executemany(c, _RESULT_VIEW_UPSERT_SQL, entries)
+    except Exception as exc:
+        logging.warning("Could not flush %s result view record(s): %s", len(entries), exc)
+
+def _result_view_worker_loop():
+    while True:
+        try:
+            entries = [_RESULT_VIEW_QUEUE.get()]
+            # Give bursty traffic a moment to coalesce into one write.
+            deadline = time.time() + _RESULT_VIEW_FLUSH_SECONDS
+            while len(entries) < _RESULT_VIEW_FLUSH_BATCH:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entries.append(_RESULT_VIEW_QUEUE.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            _flush_result_views(entries)
+        except Exception as exc:
+            logging.warning("Result view worker tick failed: %s", exc)
+
+def _ensure_result_view_worker():
+    global _RESULT_VIEW_WORKER_STARTED
+    if _RESULT_VIEW_WORKER_STARTED:
+        return
+    with _RESULT_VIEW_WORKER_LOCK:
+        if _RESULT_VIEW_WORKER_STARTED:
+            return
+        worker = threading.Thread(target=_result_view_worker_loop, name='result-view-writer', daemon=True)
+        worker.start()
+        _RESULT_VIEW_WORKER_STARTED = True
+
 def record_result_view(school_id, student_id, term, academic_year=''):
-    """Mark a published result as viewed by student."""
+    """Mark a published result as viewed by student (write deferred off-request)."""
     if not school_id or not student_id or not term:
         return
     academic_year = academic_year or ''
     now_ts = datetime.now().isoformat()
-    with db_connection(commit=True) as conn:
-        c = conn.cursor()
-        db_execute(
-            c,
-            """INSERT INTO result_views
-               (school_id, student_id, term, academic_year, first_viewed_at, last_viewed_at, view_count)
-               VALUES (?, ?, ?, ?, ?, ?, 1)
-               ON CONFLICT(school_id, student_id, term, academic_year) DO UPDATE SET
-                 last_viewed_at = excluded.last_viewed_at,
-                 view_count = result_views.view_count + 1""",
-            (school_id, student_id, term, academic_year, now_ts, now_ts),
-        )
+    entry = (school_id, student_id, term, academic_year, now_ts, now_ts)
+    _ensure_result_view_worker()
+    try:
+        _RESULT_VIEW_QUEUE.put_nowait(entry)
+    except queue.Full:
+        # Never drop the record: fall back to the old synchronous write.
+        _flush_result_views([entry])
 
 def get_class_published_view_counts(school_id, term, academic_year='', classnames=None):
     """Return {classname: {published_count, viewed_count}} for one term."""
@@ -20700,6 +21015,36 @@ def get_viewed_student_ids_for_classes(school_id, classnames, term, academic_yea
         )
         return {row[0] for row in c.fetchall() if row and row[0]}
 
+class PublicationRow:
+    """Slotted per-class row for the publication status dashboard.
+
+    A dashboard can carry one row per class per term; __slots__ keeps
+    each row to a fixed struct instead of a dict. Attribute access
+    covers the templates, while __getitem__/get keep the dict-style
+    callers working unchanged.
+    """
+
+    __slots__ = (
+        'classname', 'teacher_name', 'teacher_id', 'term', 'academic_year',
+        'is_published', 'published_at', 'approval_status',
+        'submitted_at', 'submitted_by', 'reviewed_at', 'reviewed_by', 'review_note',
+        'published_count', 'viewed_count',
+        'term_locked', 'term_unlock_reason', 'term_unlocked_until',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
 def get_school_publication_statuses(school_id, term, academic_year='', assignments=None):
     """Get class publication/view status for school admin dashboard."""
     ensure_result_publication_approval_columns()
@@ -20777,26 +21122,26 @@ def get_school_publication_statuses(school_id, term, academic_year='', assignmen
         cnt = counts_by_class.get(classname, {})
         lock_status = get_term_edit_lock_status(school_id, classname, term, academic_year or '')
         seen_classes.add(classname)
-        out.append({
-            'classname': classname,
-            'teacher_name': a.get('teacher_name', '') or pub.get('teacher_name', ''),
-            'teacher_id': a.get('teacher_id', ''),
-            'term': term,
-            'academic_year': academic_year or '',
-            'is_published': bool(pub.get('is_published', False)),
-            'published_at': pub.get('published_at', ''),
-            'approval_status': pub.get('approval_status', 'not_submitted'),
-            'submitted_at': pub.get('submitted_at', ''),
-            'submitted_by': pub.get('submitted_by', ''),
-            'reviewed_at': pub.get('reviewed_at', ''),
-            'reviewed_by': pub.get('reviewed_by', ''),
-            'review_note': pub.get('review_note', ''),
-            'published_count': int(cnt.get('published_count', 0)),
-            'viewed_count': int(cnt.get('viewed_count', 0)),
-            'term_locked': bool(lock_status.get('locked', False)),
-            'term_unlock_reason': lock_status.get('reason', ''),
-            'term_unlocked_until': lock_status.get('unlocked_until'),
-        })
+        out.append(PublicationRow(
+            classname=classname,
+            teacher_name=a.get('teacher_name', '') or pub.get('teacher_name', ''),
+            teacher_id=a.get('teacher_id', ''),
+            term=term,
+            academic_year=academic_year or '',
+            is_published=bool(pub.get('is_published', False)),
+            published_at=pub.get('published_at', ''),
+            approval_status=pub.get('approval_status', 'not_submitted'),
+            submitted_at=pub.get('submitted_at', ''),
+            submitted_by=pub.get('submitted_by', ''),
+            reviewed_at=pub.get('reviewed_at', ''),
+            reviewed_by=pub.get('reviewed_by', ''),
+            review_note=pub.get('review_note', ''),
+            published_count=int(cnt.get('published_count', 0)),
+            viewed_count=int(cnt.get('viewed_count', 0)),
+            term_locked=bool(lock_status.get('locked', False)),
+            term_unlock_reason=lock_status.get('reason', ''),
+            term_unlocked_until=lock_status.get('unlocked_until'),
+        ))
     for classname, pub in publication_rows.items():
         if not classname or classname in seen_classes:
             continue
@@ -20804,26 +21149,26 @@ def get_school_publication_statuses(school_id, term, academic_year='', assignmen
             continue
         cnt = counts_by_class.get(classname, {})
         lock_status = get_term_edit_lock_status(school_id, classname, term, academic_year or '')
-        out.append({
-            'classname': classname,
-            'teacher_name': pub.get('teacher_name', ''),
-            'teacher_id': pub.get('teacher_id', ''),
-            'term': term,
-            'academic_year': academic_year or '',
-            'is_published': bool(pub.get('is_published', False)),
-            'published_at': pub.get('published_at', ''),
-            'approval_status': pub.get('approval_status', 'not_submitted'),
-            'submitted_at': pub.get('submitted_at', ''),
-            'submitted_by': pub.get('submitted_by', ''),
-            'reviewed_at': pub.get('reviewed_at', ''),
-            'reviewed_by': pub.get('reviewed_by', ''),
-            'review_note': pub.get('review_note', ''),
-            'published_count': int(cnt.get('published_count', 0)),
-            'viewed_count': int(cnt.get('viewed_count', 0)),
-            'term_locked': bool(lock_status.get('locked', False)),
-            'term_unlock_reason': lock_status.get('reason', ''),
-            'term_unlocked_until': lock_status.get('unlocked_until'),
-        })
+        out.append(PublicationRow(
+            classname=classname,
+            teacher_name=pub.get('teacher_name', ''),
+            teacher_id=pub.get('teacher_id', ''),
+            term=term,
+            academic_year=academic_year or '',
+            is_published=bool(pub.get('is_published', False)),
+            published_at=pub.get('published_at', ''),
+            approval_status=pub.get('approval_status', 'not_submitted'),
+            submitted_at=pub.get('submitted_at', ''),
+            submitted_by=pub.get('submitted_by', ''),
+            reviewed_at=pub.get('reviewed_at', ''),
+            reviewed_by=pub.get('reviewed_by', ''),
+            review_note=pub.get('review_note', ''),
+            published_count=int(cnt.get('published_count', 0)),
+            viewed_count=int(cnt.get('viewed_count', 0)),
+            term_locked=bool(lock_status.get('locked', False)),
+            term_unlock_reason=lock_status.get('reason', ''),
+            term_unlocked_until=lock_status.get('unlocked_until'),
+        ))
     out.sort(key=lambda x: (x.get('classname', ''), x.get('teacher_name', '')))
     return out
 
@@ -23203,7 +23548,7 @@ def _safe_json_rows(raw_value):
         if not raw:
             return []
         try:
-            value = json.loads(raw)
+            value = json_loads_fast(raw)
         except Exception:
             value = None
         if isinstance(value, list):
@@ -25137,11 +25482,22 @@ def get_teacher_subjects_for_class_term(school_id, teacher_id, classname, term='
 
 def get_teacher_subject_assignment_history(school_id, teacher_id):
     rows = get_teacher_subject_assignments(school_id, teacher_id=teacher_id)
-    years = sorted({(r.get('academic_year') or '').strip() for r in rows if (r.get('academic_year') or '').strip()}, reverse=True)
-    terms_by_year = {}
-    for year in years:
-        term_set = {(r.get('term') or '').strip() for r in rows if (r.get('academic_year') or '').strip() == year and (r.get('term') or '').strip()}
-        terms_by_year[year] = sorted(term_set, key=lambda t: term_sort_value(t))
+    # Single pass: strip each value once and group terms by year directly
+    # instead of rescanning all rows for every year.
+    term_sets_by_year = {}
+    for r in rows:
+        year = (r.get('academic_year') or '').strip()
+        if not year:
+            continue
+        term = (r.get('term') or '').strip()
+        bucket = term_sets_by_year.setdefault(year, set())
+        if term:
+            bucket.add(term)
+    years = sorted(term_sets_by_year, reverse=True)
+    terms_by_year = {
+        year: sorted(term_sets_by_year[year], key=lambda t: term_sort_value(t))
+        for year in years
+    }
     return rows, years, terms_by_year
 
 def teacher_can_score_subject(school_id, teacher_id, classname, subject_name, term='', academic_year=''):
@@ -26696,6 +27052,11 @@ def safe_auth_route(template_name):
 @app.before_request
 def normalize_session_identity_fields():
     _normalize_session_identity_context()
+    # Snapshot the identity trio once per request so handlers can read
+    # g.user_id / g.role / g.school_id instead of repeating session lookups.
+    g.user_id = session.get('user_id')
+    g.role = session.get('role')
+    g.school_id = session.get('school_id')
 
 @app.before_request
 def enforce_school_operations_toggle():
@@ -29502,22 +29863,10 @@ def school_admin_dashboard():
         classnames_for_options = []
     for cls in classnames_for_options:
         config = get_class_subject_config(school_id, cls) or {}
-        subjects = normalize_subjects_list(
-            (config.get('core_subjects') or [])
-            + (config.get('science_subjects') or [])
-            + (config.get('art_subjects') or [])
-            + (config.get('commercial_subjects') or [])
-            + (config.get('optional_subjects') or [])
-        )
+        subjects = normalize_subjects_list(_iter_config_subjects(config))
         if not subjects:
             defaults = _catalog_defaults_for_class(cls)
-            subjects = normalize_subjects_list(
-                (defaults.get('core') or [])
-                + (defaults.get('science') or [])
-                + (defaults.get('art') or [])
-                + (defaults.get('commercial') or [])
-                + (defaults.get('optional') or [])
-            )
+            subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
         class_subject_options[cls] = subjects
     publication_statuses = get_school_publication_statuses(
         school_id,
@@ -29861,22 +30210,10 @@ def school_admin_notifications():
         all_term_subject_assignments = []
         for cls in class_candidates:
             config = get_class_subject_config(school_id, cls) or {}
-            subjects = normalize_subjects_list(
-                (config.get('core_subjects') or [])
-                + (config.get('science_subjects') or [])
-                + (config.get('art_subjects') or [])
-                + (config.get('commercial_subjects') or [])
-                + (config.get('optional_subjects') or [])
-            )
+            subjects = normalize_subjects_list(_iter_config_subjects(config))
             if not subjects:
                 defaults = _catalog_defaults_for_class(cls)
-                subjects = normalize_subjects_list(
-                    (defaults.get('core') or [])
-                    + (defaults.get('science') or [])
-                    + (defaults.get('art') or [])
-                    + (defaults.get('commercial') or [])
-                    + (defaults.get('optional') or [])
-                )
+                subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
             for subj in subjects:
                 all_term_subject_assignments.append({
                     'classname': cls,
@@ -30078,22 +30415,10 @@ def school_admin_teacher_assignments():
     class_subject_options = {}
     for cls in class_options:
         config = get_class_subject_config(school_id, cls) or {}
-        subjects = normalize_subjects_list(
-            (config.get('core_subjects') or [])
-            + (config.get('science_subjects') or [])
-            + (config.get('art_subjects') or [])
-            + (config.get('commercial_subjects') or [])
-            + (config.get('optional_subjects') or [])
-        )
+        subjects = normalize_subjects_list(_iter_config_subjects(config))
         if not subjects:
             defaults = _catalog_defaults_for_class(cls)
-            subjects = normalize_subjects_list(
-                (defaults.get('core') or [])
-                + (defaults.get('science') or [])
-                + (defaults.get('art') or [])
-                + (defaults.get('commercial') or [])
-                + (defaults.get('optional') or [])
-            )
+            subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
         class_subject_options[cls] = subjects
 
     subject_options = sorted(
@@ -30281,22 +30606,10 @@ def school_admin_messages():
         subject_assignments = []
         for cls in class_options:
             config = get_class_subject_config(school_id, cls) or {}
-            subjects = normalize_subjects_list(
-                (config.get('core_subjects') or [])
-                + (config.get('science_subjects') or [])
-                + (config.get('art_subjects') or [])
-                + (config.get('commercial_subjects') or [])
-                + (config.get('optional_subjects') or [])
-            )
+            subjects = normalize_subjects_list(_iter_config_subjects(config))
             if not subjects:
                 defaults = _catalog_defaults_for_class(cls)
-                subjects = normalize_subjects_list(
-                    (defaults.get('core') or [])
-                    + (defaults.get('science') or [])
-                    + (defaults.get('art') or [])
-                    + (defaults.get('commercial') or [])
-                    + (defaults.get('optional') or [])
-                )
+                subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
             for subject_name in subjects:
                 subject_assignments.append({'subject': subject_name})
     else:
@@ -34466,13 +34779,7 @@ def teacher_period_attendance():
             )
             defaults = _catalog_defaults_for_class(selected_class)
             subject_pool.update(
-                normalize_subjects_list(
-                    (defaults.get('core') or [])
-                    + (defaults.get('science') or [])
-                    + (defaults.get('art') or [])
-                    + (defaults.get('commercial') or [])
-                    + (defaults.get('optional') or [])
-                )
+                normalize_subjects_list(_iter_catalog_subjects(defaults))
             )
             students_for_subjects = load_students(school_id, class_filter=selected_class, term_filter=current_term)
             for _, st in (students_for_subjects or {}).items():
@@ -36700,22 +37007,10 @@ def school_admin_assign_subject_teacher():
                     )
                 if base_match and base_match != cls:
                     config = get_class_subject_config(school_id, base_match) or config
-            cls_subjects = normalize_subjects_list(
-                (config.get('core_subjects') or [])
-                + (config.get('science_subjects') or [])
-                + (config.get('art_subjects') or [])
-                + (config.get('commercial_subjects') or [])
-                + (config.get('optional_subjects') or [])
-            )
+            cls_subjects = normalize_subjects_list(_iter_config_subjects(config))
             if not cls_subjects:
                 defaults = _catalog_defaults_for_class(cls)
-                cls_subjects = normalize_subjects_list(
-                    (defaults.get('core') or [])
-                    + (defaults.get('science') or [])
-                    + (defaults.get('art') or [])
-                    + (defaults.get('commercial') or [])
-                    + (defaults.get('optional') or [])
-                )
+                cls_subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
             class_subject_options[cls] = set(cls_subjects)
 
         compatible_classes = [
@@ -37043,22 +37338,10 @@ def school_admin_send_teacher_message():
 
     def _subjects_for_class(cls_name):
         config = get_class_subject_config(school_id, cls_name) or {}
-        cls_subjects = normalize_subjects_list(
-            (config.get('core_subjects') or [])
-            + (config.get('science_subjects') or [])
-            + (config.get('art_subjects') or [])
-            + (config.get('commercial_subjects') or [])
-            + (config.get('optional_subjects') or [])
-        )
+        cls_subjects = normalize_subjects_list(_iter_config_subjects(config))
         if not cls_subjects:
             defaults = _catalog_defaults_for_class(cls_name)
-            cls_subjects = normalize_subjects_list(
-                (defaults.get('core') or [])
-                + (defaults.get('science') or [])
-                + (defaults.get('art') or [])
-                + (defaults.get('commercial') or [])
-                + (defaults.get('optional') or [])
-            )
+            cls_subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
         return set(normalize_subject_name(s) for s in cls_subjects if s)
 
     if target_mode == 'subject' and target_subject:
@@ -37370,22 +37653,10 @@ def teacher_dashboard():
         synthetic_rows = []
         for cls in classes:
             config = get_class_subject_config(school_id, cls) or {}
-            subjects = normalize_subjects_list(
-                (config.get('core_subjects') or [])
-                + (config.get('science_subjects') or [])
-                + (config.get('art_subjects') or [])
-                + (config.get('commercial_subjects') or [])
-                + (config.get('optional_subjects') or [])
-            )
+            subjects = normalize_subjects_list(_iter_config_subjects(config))
             if not subjects:
                 defaults = _catalog_defaults_for_class(cls)
-                subjects = normalize_subjects_list(
-                    (defaults.get('core') or [])
-                    + (defaults.get('science') or [])
-                    + (defaults.get('art') or [])
-                    + (defaults.get('commercial') or [])
-                    + (defaults.get('optional') or [])
-                )
+                subjects = normalize_subjects_list(_iter_catalog_subjects(defaults))
             for subject_name in subjects:
                 synthetic_rows.append({
                     'teacher_id': teacher_id,
@@ -40147,9 +40418,8 @@ def teacher_enter_scores():
         student['principal_comment'] = ''
     is_locked = is_result_published(school_id, student.get('classname', ''), current_term, current_year)
     exam_config = get_assessment_config_for_class(school_id, student.get('classname', ''))
-    all_subjects = sorted(
-        get_student_offered_subjects_for_class(student, school_id, school=school),
-        key=lambda x: str(x).lower(),
+    all_subjects = sorted_subjects(
+        get_student_offered_subjects_for_class(student, school_id, school=school)
     )
     assigned_subjects = get_teacher_subjects_for_class_term(
         school_id,
@@ -40552,6 +40822,41 @@ def teacher_enter_subject_scores():
     """Subject-specific score entry page for teachers."""
     return teacher_enter_scores()
 
+# Upsert statements for the CSV-upload publication reset, prepared once at
+# module level so the commit phase can batch all touched classes together.
+RESULT_PUB_UPSERT_SQL = (
+    "INSERT INTO result_publications "
+    "(school_id, classname, term, academic_year, teacher_id, teacher_name, principal_name, is_published, published_at, "
+    "approval_status, submitted_at, submitted_by, reviewed_at, reviewed_by, review_note, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'not_submitted', NULL, NULL, NULL, NULL, NULL, CURRENT_TIMESTAMP) "
+    "ON CONFLICT(school_id, classname, term, academic_year) DO UPDATE SET "
+    "teacher_id = excluded.teacher_id, "
+    "teacher_name = excluded.teacher_name, "
+    "principal_name = excluded.principal_name, "
+    "is_published = excluded.is_published, "
+    "published_at = excluded.published_at, "
+    "approval_status = excluded.approval_status, "
+    "submitted_at = NULL, "
+    "submitted_by = NULL, "
+    "reviewed_at = NULL, "
+    "reviewed_by = NULL, "
+    "review_note = NULL, "
+    "updated_at = CURRENT_TIMESTAMP"
+)
+
+RESULT_PUB_UPSERT_SQL_LEGACY = (
+    "INSERT INTO result_publications "
+    "(school_id, classname, term, academic_year, teacher_id, teacher_name, principal_name, is_published, published_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+    "ON CONFLICT(school_id, classname, term, academic_year) DO UPDATE SET "
+    "teacher_id = excluded.teacher_id, "
+    "teacher_name = excluded.teacher_name, "
+    "principal_name = excluded.principal_name, "
+    "is_published = excluded.is_published, "
+    "published_at = excluded.published_at, "
+    "updated_at = CURRENT_TIMESTAMP"
+)
+
 @app.route('/teacher/upload-csv', methods=['GET', 'POST'])
 @require_roles('teacher')
 def teacher_upload_csv():
@@ -40604,19 +40909,21 @@ def teacher_upload_csv():
             'updated_classes': 0,
             'error_token': '',
         }
-        rows = []
-        headers = {}
+        raw_header = []
         fieldnames = []
+        err_fields = []
         current_row_num = 0
         current_row_data = None
         processed_rows = 0
 
+        isfinite = math.isfinite  # local bind; called for every numeric CSV cell
+
         def parse_csv_float(raw_value, row_num, field_label):
             try:
                 value = float(raw_value)
             except (TypeError, ValueError):
                 raise ValueError(f'Row {row_num}: {field_label} must be a number.')
-            if not math.isfinite(value):
+            if not isfinite(value):
                 raise ValueError(f'Row {row_num}: {field_label} is invalid.')
             return value
         try:
@@ -40625,21 +40932,44 @@ def teacher_upload_csv():
                 raise ValueError('Please upload a valid CSV file (.csv).')
 
             csv_content = file.read().decode('utf-8-sig')
-            reader = csv.DictReader(StringIO(csv_content))
-            if not reader.fieldnames:
+            reader = csv.reader(StringIO(csv_content))
+            raw_header = next(reader, None)
+            if not raw_header:
                 raise ValueError('CSV is empty or has no header row.')
-            rows = list(reader)
-            fieldnames = [h for h in (reader.fieldnames or []) if h]
-            csv_result['total_rows'] = len(rows)
-            headers = {h.strip().lower(): h for h in reader.fieldnames if h}
-            has_exam_col = 'exam score' in headers
-            has_obj_col = 'objective' in headers
-            has_theory_col = 'theory' in headers
-
-            score_mode = ('student id' in headers) and ('subject' in headers)
+            fieldnames = [h for h in raw_header if h]
+            err_fields = fieldnames + ['Error']
+            # Resolve column indices once so the row loop reads cells by
+            # integer index instead of building a dict per row.
+            col_idx = {}
+            for i, h in enumerate(raw_header):
+                key = (h or '').strip().lower()
+                if key:
+                    col_idx[key] = i
+            sid_idx = col_idx.get('student id')
+            subj_idx = col_idx.get('subject')
+            comment_idx = col_idx.get('teacher comment')
+            exam_idx = col_idx.get('exam score')
+            obj_idx = col_idx.get('objective')
+            theory_idx = col_idx.get('theory')
+            has_exam_col = exam_idx is not None
+            has_obj_col = obj_idx is not None
+            has_theory_col = theory_idx is not None
+
+            score_mode = (sid_idx is not None) and (subj_idx is not None)
             grade_cfg = get_grade_config(school_id)
             if not score_mode:
                 raise ValueError('CSV must include "Student ID" and "Subject" columns.')
+            max_tests = max(1, min(safe_int(school.get('max_tests', 3), 3), 10))
+            test_total_max = max(0.0, safe_float(school.get('test_score_max', 30), 30))
+            test_idx = [col_idx.get(f'test {i}') for i in range(1, max_tests + 1)]
+            test_fields = [f'test_{i}' for i in range(1, max_tests + 1)]
+            test_enabled = school.get('test_enabled', 1)
+            exam_enabled = school.get('exam_enabled', 1)
+
+            def cell(row, idx):
+                if idx is None or idx >= len(row):
+                    return ''
+                return row[idx] or ''
 
             updated_students = set()
             staged_students = {}
@@ -40647,16 +40977,31 @@ def teacher_upload_csv():
             staged_changed_subjects = {}
             touched_classes = set()
             skipped_teacher_comment_overwrites = set()
-            for idx, row in enumerate(rows, start=2):
+            # One publication lookup per class up front instead of one per row.
+            published_locked = {
+                (cls or '').strip().lower()
+                for cls in allowed_classes
+                if is_result_published(school_id, cls, current_term, current_year)
+            }
+            # Stream rows straight from the reader; only the current row is
+            # kept (for the error export), not the whole file.
+            for idx, row in enumerate(reader, start=2):
                 current_row_num = idx
                 current_row_data = row
-                student_id = (row.get(headers['student id'], '') or '').strip()
-                raw_subject = (row.get(headers['subject'], '') or '').strip()
+                # Excel re-saves commonly append all-blank trailing rows;
+                # skip them before any normalization or lookups.
+                if not row or not any(v.strip() for v in row if v):
+                    continue
+                student_id = cell(row, sid_idx).strip()
+                raw_subject = cell(row, subj_idx).strip()
                 subject = normalize_subject_name(raw_subject)
                 if not student_id or not subject:
                     continue
                 processed_rows += 1
 
+                # staged_students keeps every student seen this upload, so a
+                # student is loaded from the DB exactly once no matter how its
+                # rows are interleaved across the file.
                 student = staged_students.get(student_id)
                 if not student:
                     student = load_student(school_id, student_id)
@@ -40664,20 +41009,27 @@ def teacher_upload_csv():
                     raise ValueError(f'Row {idx}: student "{student_id}" not found.')
                 if student_id not in staged_original_scores:
                     current_scores = student.get('scores', {}) if isinstance(student.get('scores', {}), dict) else {}
-                    staged_original_scores[student_id] = {
-                        subj: (dict(vals) if isinstance(vals, dict) else {})
-                        for subj, vals in current_scores.items()
-                    }
+                    # Shallow snapshot: the loop below edits fresh copies of
+                    # subject blocks, never the originals referenced here.
+                    staged_original_scores[student_id] = dict(current_scores)
                 classname = (student.get('classname') or '').strip()
-                if classname.lower() not in allowed_classes_normalized:
+                classname_lc = student.get('__classname_lc__')
+                if classname_lc is None:
+                    classname_lc = classname.lower()
+                    student['__classname_lc__'] = classname_lc
+                if classname_lc not in allowed_classes_normalized:
                     raise ValueError(f'Row {idx}: class "{classname}" for {student_id} is not assigned to you.')
-                if is_result_published(school_id, classname, current_term, current_year):
+                if classname_lc in published_locked:
                     raise ValueError(f'Row {idx}: {classname} ({current_term}) is already published and locked.')
 
-                subject_map = {str(s).strip().lower(): s for s in (student.get('subjects') or [])}
-                if subject.lower() not in subject_map:
+                subject_map = student.get('__subject_map__')
+                if subject_map is None:
+                    subject_map = {str(s).strip().lower(): s for s in (student.get('subjects') or [])}
+                    student['__subject_map__'] = subject_map
+                subject_lc = subject.lower()
+                if subject_lc not in subject_map:
                     raise ValueError(f'Row {idx}: subject "{subject}" is not in {student_id} subject list.')
-                subject_key = subject_map[subject.lower()]
+                subject_key = subject_map[subject_lc]
                 if not teacher_can_score_subject(
                     school_id,
                     teacher_id,
@@ -40698,43 +41050,46 @@ def teacher_upload_csv():
                     student['term'] = current_term
 
                 exam_config = get_assessment_config_for_class(school_id, classname)
-                max_tests = max(1, min(safe_int(school.get('max_tests', 3), 3), 10))
-                test_total_max = max(0.0, safe_float(school.get('test_score_max', 30), 30))
                 existing_scores = student.get('scores', {}) if isinstance(student.get('scores', {}), dict) else {}
-                subject_scores = existing_scores.get(subject_key, {}) if isinstance(existing_scores.get(subject_key, {}), dict) else {}
-                previous_subject_scores = dict(subject_scores) if isinstance(subject_scores, dict) else {}
+                previous_subject_scores = existing_scores.get(subject_key, {}) if isinstance(existing_scores.get(subject_key, {}), dict) else {}
+                subject_scores = dict(previous_subject_scores)
                 entry_touched = False
                 subject_scores.pop('overall_mark', None)
                 subject_scores.pop('total_score', None)
                 subject_scores.pop('grade', None)
 
-                if school.get('test_enabled', 1):
+                if test_enabled:
+                    # Validate, store and accumulate in one pass over the test
+                    # columns instead of re-reading every test_i key afterwards.
+                    total_test = 0.0
                     for i in range(1, max_tests + 1):
-                        test_col = headers.get(f'test {i}')
-                        raw_test = (row.get(test_col, '') if test_col else '')
-                        if str(raw_test).strip() != '':
+                        field = test_fields[i - 1]
+                        raw_test = cell(row, test_idx[i - 1]).strip()
+                        if raw_test == '':
+                            test_val = float(subject_scores.get(field, 0) or 0)
+                        else:
                             entry_touched = True
-                        test_val = float(subject_scores.get(f'test_{i}', 0) or 0) if str(raw_test).strip() == '' else parse_csv_float(raw_test, idx, f'Test {i} for {student_id} {subject_key}')
+                            test_val = parse_csv_float(raw_test, idx, f'Test {i} for {student_id} {subject_key}')
                         if test_val < 0 or test_val > test_total_max:
                             raise ValueError(f'Row {idx}: Test {i} for {student_id} {subject_key} must be 0..{test_total_max:g}.')
-                        subject_scores[f'test_{i}'] = test_val
-                    subject_scores['total_test'] = sum(subject_scores.get(f'test_{i}', 0) for i in range(1, max_tests + 1))
-                    if subject_scores['total_test'] > test_total_max:
+                        subject_scores[field] = test_val
+                        total_test += test_val
+                    subject_scores['total_test'] = total_test
+                    if total_test > test_total_max:
                         raise ValueError(f'Row {idx}: Total test score for {student_id} {subject_key} must be <= {test_total_max:g}.')
                 else:
                     subject_scores['total_test'] = 0
 
-                if school.get('exam_enabled', 1):
+                if exam_enabled:
                     if exam_config.get('exam_mode') == 'combined':
                         if not has_exam_col:
                             raise ValueError('CSV must include "Exam Score" column for combined exam mode.')
-                        if (has_obj_col and str(row.get(headers['objective'], '') or '').strip()) or (has_theory_col and str(row.get(headers['theory'], '') or '').strip()):
+                        if (has_obj_col and str(cell(row, obj_idx)).strip()) or (has_theory_col and str(cell(row, theory_idx)).strip()):
                             raise ValueError(f'Row {idx}: combined exam mode does not allow Objective/Theory values. Use Exam Score only.')
-                        exam_col = headers.get('exam score')
-                        raw_exam = row.get(exam_col, '') if exam_col else ''
-                        if str(raw_exam).strip() != '':
+                        raw_exam = cell(row, exam_idx).strip()
+                        if raw_exam != '':
                             entry_touched = True
-                        exam_score = float(subject_scores.get('exam_score', subject_scores.get('total_exam', 0)) or 0) if str(raw_exam).strip() == '' else parse_csv_float(raw_exam, idx, f'Exam score for {student_id} {subject_key}')
+                        exam_score = float(subject_scores.get('exam_score', subject_scores.get('total_exam', 0)) or 0) if raw_exam == '' else parse_csv_float(raw_exam, idx, f'Exam score for {student_id} {subject_key}')
                         exam_max = max(0.0, safe_float(exam_config.get('exam_score_max', 70), 70))
                         if exam_score < 0 or exam_score > exam_max:
                             raise ValueError(f'Row {idx}: Exam score for {student_id} {subject_key} must be 0..{exam_max:g}.')
@@ -40746,16 +41101,14 @@ def teacher_upload_csv():
                     else:
                         if not has_obj_col or not has_theory_col:
                             raise ValueError('CSV must include both "Objective" and "Theory" columns for separate exam mode.')
-                        if has_exam_col and str(row.get(headers['exam score'], '') or '').strip():
+                        if has_exam_col and str(cell(row, exam_idx)).strip():
                             raise ValueError(f'Row {idx}: separate exam mode does not allow Exam Score value. Use Objective and Theory only.')
-                        obj_col = headers.get('objective')
-                        thy_col = headers.get('theory')
-                        raw_obj = row.get(obj_col, '') if obj_col else ''
-                        raw_thy = row.get(thy_col, '') if thy_col else ''
-                        if str(raw_obj).strip() != '' or str(raw_thy).strip() != '':
+                        raw_obj = cell(row, obj_idx).strip()
+                        raw_thy = cell(row, theory_idx).strip()
+                        if raw_obj != '' or raw_thy != '':
                             entry_touched = True
-                        objective = float(subject_scores.get('objective', 0) or 0) if str(raw_obj).strip() == '' else parse_csv_float(raw_obj, idx, f'Objective for {student_id} {subject_key}')
-                        theory = float(subject_scores.get('theory', 0) or 0) if str(raw_thy).strip() == '' else parse_csv_float(raw_thy, idx, f'Theory for {student_id} {subject_key}')
+                        objective = float(subject_scores.get('objective', 0) or 0) if raw_obj == '' else parse_csv_float(raw_obj, idx, f'Objective for {student_id} {subject_key}')
+                        theory = float(subject_scores.get('theory', 0) or 0) if raw_thy == '' else parse_csv_float(raw_thy, idx, f'Theory for {student_id} {subject_key}')
                         objective_max = max(0.0, safe_float(exam_config.get('objective_max', 30), 30))
                         theory_max = max(0.0, safe_float(exam_config.get('theory_max', 40), 40))
                         exam_total_max = max(0.0, safe_float(exam_config.get('exam_score_max', objective_max + theory_max), objective_max + theory_max))
@@ -40790,9 +41143,8 @@ def teacher_upload_csv():
                 student['scores'] = existing_scores
                 student['term'] = current_term
 
-                comment_col = headers.get('teacher comment')
-                if comment_col:
-                    comment = (row.get(comment_col, '') or '').strip()
+                if comment_idx is not None:
+                    comment = cell(row, comment_idx).strip()
                     if comment:
                         existing_comment = (student.get('teacher_comment', '') or '').strip()
                         if existing_comment and existing_comment != comment:
@@ -40803,6 +41155,7 @@ def teacher_upload_csv():
                 updated_students.add(student_id)
                 touched_classes.add(classname)
 
+            csv_result['total_rows'] = max(0, current_row_num - 1)
             if processed_rows == 0:
                 raise ValueError('No valid data rows found. Fill at least Student ID and Subject in one row.')
 
@@ -40812,8 +41165,8 @@ def teacher_upload_csv():
                 c = conn.cursor()
                 principal_name = (school.get('principal_name', '') or '').strip()
                 teacher_name = f"{teacher_profile.get('firstname', '')} {teacher_profile.get('lastname', '')}".strip() or str(teacher_id)
+                save_students_with_cursor(c, school_id, staged_students, school_for_stream=school)
                 for sid, student_data in staged_students.items():
-                    save_student_with_cursor(c, school_id, sid, student_data)
                     audit_student_score_changes_with_cursor(
                         c=c,
                         school_id=school_id,
@@ -40829,48 +41182,15 @@ def teacher_upload_csv():
                         change_reason='',
                         subjects_scope=sorted(staged_changed_subjects.get(sid, set())),
                     )
-                for classname in touched_classes:
-                    if has_approval_cols:
-                        db_execute(
-                            c,
-                            (
-                                "INSERT INTO result_publications "
-                                "(school_id, classname, term, academic_year, teacher_id, teacher_name, principal_name, is_published, published_at, "
-                                "approval_status, submitted_at, submitted_by, reviewed_at, reviewed_by, review_note, updated_at) "
-                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'not_submitted', NULL, NULL, NULL, NULL, NULL, CURRENT_TIMESTAMP) "
-                                "ON CONFLICT(school_id, classname, term, academic_year) DO UPDATE SET "
-                                "teacher_id = excluded.teacher_id, "
-                                "teacher_name = excluded.teacher_name, "
-                                "principal_name = excluded.principal_name, "
-                                "is_published = excluded.is_published, "
-                                "published_at = excluded.published_at, "
-                                "approval_status = excluded.approval_status, "
-                                "submitted_at = NULL, "
-                                "submitted_by = NULL, "
-                                "reviewed_at = NULL, "
-                                "reviewed_by = NULL, "
-                                "review_note = NULL, "
-                                "updated_at = CURRENT_TIMESTAMP"
-                            ),
-                            (school_id, classname, current_term, current_year or '', teacher_id, teacher_name, principal_name, 0, None),
-                        )
-                    else:
-                        db_execute(
-                            c,
-                            (
-                                "INSERT INTO result_publications "
-                                "(school_id, classname, term, academic_year, teacher_id, teacher_name, principal_name, is_published, published_at, updated_at) "
-                                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
-                                "ON CONFLICT(school_id, classname, term, academic_year) DO UPDATE SET "
-                                "teacher_id = excluded.teacher_id, "
-                                "teacher_name = excluded.teacher_name, "
-                                "principal_name = excluded.principal_name, "
-                                "is_published = excluded.is_published, "
-                                "published_at = excluded.published_at, "
-                                "updated_at = CURRENT_TIMESTAMP"
-                            ),
-                            (school_id, classname, current_term, current_year or '', teacher_id, teacher_name, principal_name, 0, None),
-                        )
+                pub_params = [
+                    (school_id, cls, current_term, current_year or '', teacher_id, teacher_name, principal_name, 0, None)
+                    for cls in touched_classes
+                ]
+                db_executemany(
+                    c,
+                    RESULT_PUB_UPSERT_SQL if has_approval_cols else RESULT_PUB_UPSERT_SQL_LEGACY,
+                    pub_params,
+                )
 
             csv_message = f'CSV uploaded successfully. Updated {len(updated_students)} student(s).'
             if skipped_teacher_comment_overwrites:
@@ -40890,10 +41210,13 @@ def teacher_upload_csv():
             error_token = ''
             if current_row_num and current_row_data and fieldnames:
                 output = StringIO()
-                err_fields = list(fieldnames) + ['Error']
                 writer = csv.DictWriter(output, fieldnames=err_fields)
                 writer.writeheader()
-                row_out = {h: (current_row_data.get(h, '') if isinstance(current_row_data, dict) else '') for h in fieldnames}
+                if isinstance(current_row_data, dict):
+                    row_map = current_row_data
+                else:
+                    row_map = dict(zip(raw_header, current_row_data or []))
+                row_out = {h: row_map.get(h, '') for h in fieldnames}
                 row_out['Error'] = error_message
                 writer.writerow(row_out)
                 fname = f'csv_upload_error_row_{current_row_num}.csv'
@@ -40907,6 +41230,9 @@ def teacher_upload_csv():
             csv_result.update({
                 'success': False,
                 'message': error_message,
+                # Rows read before the failure, so the error summary still
+                # shows how far through the file the upload got.
+                'total_rows': max(0, current_row_num - 1),
                 'processed_rows': processed_rows,
                 'error_token': error_token,
             })
@@ -40953,6 +41279,30 @@ def teacher_upload_csv_error_rows(token):
         headers={'Content-Disposition': f'attachment; filename={item.get("filename", "csv_upload_error_rows.csv")}'}
     )
 
+@lru_cache(maxsize=64)
+def build_header_spec(max_tests, exam_mode_view, include_tests=True, include_exam=True, lead_col='Student ID', include_comment=False):
+    """Shared CSV header layout for the score template/upload routes.
+
+    Returns (headers, col_index): the column titles and a lowercase
+    title -> position map. Cached because the same few layouts are
+    rebuilt on every template download.
+    """
+    headers = [lead_col, 'Subject']
+    if include_tests:
+        headers.extend(f'Test {i}' for i in range(1, max_tests + 1))
+    if include_exam:
+        if exam_mode_view == 'combined':
+            headers.append('Exam Score')
+        elif exam_mode_view == 'separate':
+            headers.extend(('Objective', 'Theory'))
+        elif exam_mode_view == 'mixed':
+            headers.extend(('Objective', 'Theory', 'Exam Score'))
+    if include_comment:
+        headers.append('Teacher Comment')
+    headers = tuple(headers)
+    col_index = {h.lower(): i for i, h in enumerate(headers)}
+    return headers, col_index
+
 @app.route('/teacher/upload-csv-template')
 def teacher_upload_csv_template():
     """Download CSV template for score upload."""
@@ -40991,28 +41341,12 @@ def teacher_upload_csv_template():
         else:
             exam_mode_view = 'separate'
 
-    headers = ['Student ID', 'Subject']
-    headers.extend([f'Test {i}' for i in range(1, max_tests + 1)])
-    if exam_mode_view == 'combined':
-        headers.append('Exam Score')
-    elif exam_mode_view == 'separate':
-        headers.extend(['Objective', 'Theory'])
-    elif exam_mode_view == 'mixed':
-        headers.extend(['Objective', 'Theory', 'Exam Score'])
-    headers.append('Teacher Comment')
+    headers, _ = build_header_spec(max_tests, exam_mode_view, include_comment=True)
 
     output = StringIO()
     writer = csv.writer(output)
     writer.writerow(headers)
-    sample = ['26/school/001/26', 'Mathematics']
-    sample.extend(['' for _ in range(max_tests)])
-    if exam_mode_view == 'combined':
-        sample.append('')
-    elif exam_mode_view == 'separate':
-        sample.extend(['', ''])
-    elif exam_mode_view == 'mixed':
-        sample.extend(['', '', ''])
-    sample.append('')
+    sample = ['26/school/001/26', 'Mathematics'] + [''] * (len(headers) - 2)
     writer.writerow(sample)
 
     filename = f'score_upload_template_{exam_mode_view}_{max_tests}_tests.csv'
@@ -41061,57 +41395,62 @@ def teacher_result_sheet_template():
     include_tests = bool(school.get('test_enabled', 1))
     include_exam = bool(school.get('exam_enabled', 1))
 
-    headers = ['Class', 'Subject']
-    if include_tests:
-        headers.extend([f'Test {i}' for i in range(1, max_tests + 1)])
-    if include_exam:
-        # Keep all exam score columns so one template works across combined/separate classes.
-        headers.extend(['Objective', 'Theory', 'Exam Score'])
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(headers)
+    # 'mixed' keeps all exam score columns so one template works across
+    # combined/separate classes.
+    headers, _ = build_header_spec(
+        max_tests,
+        'mixed',
+        include_tests=include_tests,
+        include_exam=include_exam,
+        lead_col='Class',
+    )
+
+    # Row tails depend only on school settings and the class exam mode, so
+    # build them once instead of re-checking the flags per subject row.
+    test_cells = [0] * max_tests if include_tests else []
+    tail_by_mode = {
+        'combined': test_cells + (['', '', 0] if include_exam else []),
+        'separate': test_cells + ([0, 0, ''] if include_exam else []),
+    }
 
-    for classname in target_classes:
-        config = get_class_subject_config(school_id, classname) or {}
-        subjects = _dedupe_keep_order([
-            normalize_subject_name(s)
-            for s in (
-                (config.get('core_subjects') or [])
-                + (config.get('science_subjects') or [])
-                + (config.get('art_subjects') or [])
-                + (config.get('commercial_subjects') or [])
-                + (config.get('optional_subjects') or [])
-            )
-            if str(s).strip()
-        ])
-        if not subjects:
-            defaults = _catalog_defaults_for_class(classname)
+    def generate():
+        # One small reusable buffer; each yield flushes a class worth of rows
+        # so memory stays O(1) in the number of classes/subjects.
+        buf = StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(headers)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        for classname in target_classes:
+            config = get_class_subject_config(school_id, classname) or {}
             subjects = _dedupe_keep_order([
                 normalize_subject_name(s)
-                for bucket in ('core', 'science', 'art', 'commercial', 'optional')
-                for s in (defaults.get(bucket) or [])
+                for s in _iter_config_subjects(config)
                 if str(s).strip()
             ])
-        if not subjects:
-            subjects = ['Subject']
+            if not subjects:
+                defaults = _catalog_defaults_for_class(classname)
+                subjects = _dedupe_keep_order([
+                    normalize_subject_name(s)
+                    for s in _iter_catalog_subjects(defaults)
+                    if str(s).strip()
+                ])
+            if not subjects:
+                subjects = ['Subject']
 
-        class_exam_mode = (get_assessment_config_for_class(school_id, classname).get('exam_mode') or 'separate').lower()
-        for subject in subjects:
-            row = [classname, subject]
-            if include_tests:
-                row.extend([0 for _ in range(max_tests)])
-            if include_exam:
-                if class_exam_mode == 'combined':
-                    row.extend(['', '', 0])
-                else:
-                    row.extend([0, 0, ''])
-            writer.writerow(row)
+            class_exam_mode = (get_assessment_config_for_class(school_id, classname).get('exam_mode') or 'separate').lower()
+            tail = tail_by_mode.get(class_exam_mode, tail_by_mode['separate'])
+            for subject in subjects:
+                writer.writerow([classname, subject] + tail)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
 
     class_token = canonicalize_classname(target_classes[0]) if len(target_classes) == 1 else 'ALL_CLASSES'
     filename = f'result_sheet_template_{class_token}.csv'
     return Response(
-        output.getvalue(),
+        stream_with_context(generate()),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
@@ -41861,12 +42200,7 @@ def student_view_result():
     selected_class = (request.args.get('class_name', '') or '').strip()
     term_notice = ''
 
-    all_published_terms = get_published_terms_for_student(school_id, student_id)
-    available_result_classes = sorted({
-        (t.get('classname') or '').strip()
-        for t in all_published_terms
-        if (t.get('classname') or '').strip()
-    })
+    available_result_classes = get_published_classes_for_student(school_id, student_id)
     if selected_class and selected_class not in available_result_classes:
         term_notice = f'No published results found for class "{selected_class}".'
         selected_class = ''
@@ -41969,9 +42303,7 @@ def student_view_result():
         classname=snapshot.get('classname', ''),
     )
 
-    current_index = next((i for i, item in enumerate(published_terms) if item['token'] == current_term_token), 0)
-    prev_term = published_terms[current_index - 1] if current_index > 0 else None
-    next_term = published_terms[current_index + 1] if current_index < len(published_terms) - 1 else None
+    current_index, prev_term, next_term = _neighbor_terms(published_terms, current_term_token)
 
     return render_template('student/student_result.html', 
                          student=student_view,
@@ -43337,9 +43669,7 @@ def parent_view_result():
         academic_year=target_year,
         classname=snapshot.get('classname', ''),
     )
-    current_index = next((i for i, item in enumerate(published_terms) if item['token'] == current_term_token), 0)
-    prev_term = published_terms[current_index - 1] if current_index > 0 else None
-    next_term = published_terms[current_index + 1] if current_index < len(published_terms) - 1 else None
+    current_index, prev_term, next_term = _neighbor_terms(published_terms, current_term_token)
     return render_template(
         'student/student_result.html',
         student=result_student,
@@ -43700,9 +44030,7 @@ def teacher_student_result():
         academic_year=target_year,
         classname=snapshot_class,
     )
-    current_index = next((i for i, item in enumerate(published_terms) if item['token'] == current_term_token), 0)
-    prev_term = published_terms[current_index - 1] if current_index > 0 else None
-    next_term = published_terms[current_index + 1] if current_index < len(published_terms) - 1 else None
+    current_index, prev_term, next_term = _neighbor_terms(published_terms, current_term_token)
     return render_template(
         'student/student_result.html',
         student=result_student,
@@ -44028,9 +44356,7 @@ def school_admin_student_result():
         term_choices = list(published_terms or [])
         if not any((row.get('token') or '') == current_term_token for row in term_choices):
             term_choices.append(preview_entry)
-        current_index = next((i for i, item in enumerate(term_choices) if item['token'] == current_term_token), 0)
-        prev_term = term_choices[current_index - 1] if current_index > 0 else None
-        next_term = term_choices[current_index + 1] if current_index < len(term_choices) - 1 else None
+        current_index, prev_term, next_term = _neighbor_terms(term_choices, current_term_token)
         term_notice = 'Draft preview: this sheet uses currently entered scores and may still be incomplete because results have not been submitted/published yet.'
         published_terms = term_choices
     else:
@@ -44101,9 +44427,7 @@ def school_admin_student_result():
             academic_year=target_year,
             classname=snapshot.get('classname', ''),
         )
-        current_index = next((i for i, item in enumerate(published_terms) if item['token'] == current_term_token), 0)
-        prev_term = published_terms[current_index - 1] if current_index > 0 else None
-        next_term = published_terms[current_index + 1] if current_index < len(published_terms) - 1 else None
+        current_index, prev_term, next_term = _neighbor_terms(published_terms, current_term_token)
         term_notice = ''
 
     return render_template(
@@ -44546,13 +44870,14 @@ def check_result():
     archive_clause = ' AND COALESCE(s.is_archived, 0) = 0' if has_archive_cols else ''
     with db_connection() as conn:
         c = conn.cursor()
+        # Single-table index seek; current_term comes from the cached school
+        # object loaded just below instead of a JOIN against schools.
         db_execute(
             c,
             (
-                "SELECT s.school_id, s.student_id, s.firstname, s.classname, s.term, s.stream, "
-                "s.number_of_subject, s.subjects, s.scores, sc.current_term "
+                "SELECT s.school_id, s.student_id, s.firstname, s.classname, s.stream, "
+                "s.number_of_subject "
                 "FROM students s "
-                "JOIN schools sc ON sc.school_id = s.school_id "
                 "WHERE s.school_id = ? AND s.student_id = ? "
                 f"{archive_clause} "
                 "LIMIT 1"
@@ -44566,12 +44891,13 @@ def check_result():
         flash('Invalid Student ID or password.', 'error')
         return redirect(url_for('student_portal'))
 
-    school_id, sid, firstname, classname, term, stream, number_of_subject, subjects_str, scores_str, current_term = row
+    school_id, sid, firstname, classname, stream, number_of_subject = row
     if user.get('school_id') != school_id:
         update_user_school_id_only(user.get('username'), school_id)
     clear_failed_login('check_result', student_id, client_ip)
     record_login_audit(student_id, 'student', school_id, 'check_result', True, '')
     school = get_school(school_id) or {}
+    current_term = get_current_term(school)
     published_terms = filter_visible_terms_for_student(school, get_published_terms_for_student(school_id, sid))
     if not published_terms:
         if safe_int((school or {}).get('operations_enabled', 1), 1):
@@ -44683,23 +45009,24 @@ def check_result():
         now=datetime.now()
     )
 
+# Home dashboard endpoint per role, shared by /menu dispatch and /help's
+# back-link fallback.
+_ROLE_HOME = {
+    'super_admin': 'super_admin_dashboard',
+    'school_admin': 'school_admin_dashboard',
+    'teacher': 'teacher_dashboard',
+    'student': 'student_dashboard',
+    'parent': 'parent_dashboard',
+}
+
 @app.route('/menu')
 def menu():
     if 'user_id' not in session:
         return redirect(url_for('login'))
-    
-    role = session.get('role')
-    if role == 'super_admin':
-        return redirect(url_for('super_admin_dashboard'))
-    elif role == 'school_admin':
-        return redirect(url_for('school_admin_dashboard'))
-    elif role == 'teacher':
-        return redirect(url_for('teacher_dashboard'))
-    elif role == 'student':
-        return redirect(url_for('student_dashboard'))
-    elif role == 'parent':
-        return redirect(url_for('parent_dashboard'))
-    
+
+    home_endpoint = _ROLE_HOME.get(session.get('role'))
+    if home_endpoint:
+        return redirect(url_for(home_endpoint))
     return render_template('shared/menu.html')
 
 @app.route('/change_password', methods=['GET', 'POST'])
@@ -44782,7 +45109,10 @@ def view_students():
             selected_class = ''
         if selected_term and selected_term not in set(available_terms):
             selected_term = ''
-        students_data = load_students_for_classes(school_id, class_set, term_filter=selected_term)
+        # Load only the class being viewed when one is selected; otherwise
+        # the teacher's own classes. Never the whole school.
+        load_classes = {selected_class} if selected_class else class_set
+        students_data = load_students_for_classes(school_id, load_classes, term_filter=selected_term)
         teacher_result_classes_lower = {(c or '').strip().lower() for c in class_owner_set}
         subject_map_by_class = {}
         for row in subject_rows:
@@ -44810,12 +45140,19 @@ def view_students():
         class_owner_set = set()
         subject_map_by_class = {}
 
-    if selected_class:
-        students_data = {sid: s for sid, s in students_data.items() if (s.get('classname', '') or '').strip() == selected_class}
-    if selected_term:
-        students_data = {sid: s for sid, s in students_data.items() if (s.get('term', '') or '').strip() == selected_term}
+    # Class/term filtering happens in SQL inside load_students /
+    # load_students_for_classes (with legacy-tolerant matching), so no
+    # Python re-filter pass over the loaded rows is needed here.
+
+    # Resolve grade thresholds and pass mark once; the per-student loop then
+    # only needs a bisect and a comparison instead of re-parsing the config.
+    grade_thresholds, grade_letters = build_grade_lookup(grade_cfg)
+    pass_mark = safe_float((grade_cfg or {}).get('pass_mark', (grade_cfg or {}).get('passmark', 50)), 50)
 
     students = []
+    grade_a_count = 0
+    pass_count = 0
+    average_sum = 0.0
     for student_id, student_data in students_data.items():
         if session.get('role') == 'teacher':
             classname = (student_data.get('classname', '') or '').strip()
@@ -44836,13 +45173,27 @@ def view_students():
                 is_class_owner = True
         scores = student_data.get('scores', {}) if isinstance(student_data.get('scores', {}), dict) else {}
         average_marks = compute_average_marks_from_scores(scores, subjects=student_data.get('subjects', []))
-        grade = grade_from_score(average_marks, grade_cfg)
-        status = status_from_score(average_marks, grade_cfg)
-
-        students.append({
-            'first_name': student_data.get('firstname', ''),
+        grade = grade_letters[bisect.bisect_right(grade_thresholds, average_marks)]
+        status = 'Pass' if average_marks >= pass_mark else 'Fail'
+        if grade == 'A':
+            grade_a_count += 1
+        if status == 'Pass':
+            pass_count += 1
+        average_sum += average_marks
+
+        first_name = student_data.get('firstname', '')
+        class_name = student_data.get('classname', '')
+        # Decorate with the sort key now, while the raw values are in hand,
+        # so the sort below never goes back into the dicts.
+        sort_key = (
+            (class_name or '').strip().lower(),
+            (first_name or '').strip().lower(),
+            (student_id or '').strip().lower(),
+        )
+        students.append((sort_key, {
+            'first_name': first_name,
             'student_id': student_id,
-            'class_name': student_data.get('classname', ''),
+            'class_name': class_name,
             'term': student_data.get('term', ''),
             'stream': student_data.get('stream', ''),
             'subjects': scores,
@@ -44851,21 +45202,14 @@ def view_students():
             'average_marks': average_marks,
             'Grade': grade,
             'Status': status
-        })
+        }))
 
-    students.sort(
-        key=lambda s: (
-            (s.get('class_name', '') or '').strip().lower(),
-            (s.get('first_name', '') or '').strip().lower(),
-            (s.get('student_id', '') or '').strip().lower(),
-        )
-    )
+    students.sort(key=lambda pair: pair[0])
+    students = [record for _, record in students]
 
     positions = calculate_positions(students, school.get('ss_ranking_mode', 'together'), school=school)
     total_students = len(students)
-    grade_a_count = sum(1 for s in students if s.get('Grade') == 'A')
-    pass_count = sum(1 for s in students if s.get('Status') == 'Pass')
-    overall_average = (sum(s.get('average_marks', 0) for s in students) / total_students) if total_students else 0
+    overall_average = (average_sum / total_students) if total_students else 0
     total_pages = max(1, (total_students + per_page - 1) // per_page)
     if page > total_pages:
         page = total_pages
@@ -45258,15 +45602,7 @@ def assistant_health():
 def help():
     ref = (request.referrer or '').strip()
     role = session.get('role')
-    fallback = url_for('home')
-    if role == 'super_admin':
-        fallback = url_for('super_admin_dashboard')
-    elif role == 'school_admin':
-        fallback = url_for('school_admin_dashboard')
-    elif role == 'teacher':
-        fallback = url_for('teacher_dashboard')
-    elif role == 'student':
-        fallback = url_for('student_dashboard')
+    fallback = url_for(_ROLE_HOME.get(role, 'home'))
     back_url = ref or fallback
     help_focus_anchor = 'school-admin-handbook' if role == 'school_admin' else ''
     return render_template('shared/help.html', back_url=back_url, help_focus_anchor=help_focus_anchor, role=role)
@@ -45304,9 +45640,9 @@ def report_issue():
 @app.route('/view-reports')
 def view_reports():
     """View reported issues inside the main Student Score app."""
-    if 'user_id' not in session:
+    if not g.user_id:
         return redirect(url_for('login'))
-    if session.get('role') != 'super_admin':
+    if g.role != 'super_admin':
         flash('Only super admin can view reported issues.', 'error')
         return redirect(url_for('menu'))
     # Best-effort schema heal for deployments upgraded without running init/migrations.
@@ -45324,6 +45660,24 @@ def view_reports():
         per_page = 40
     page = max(1, page)
     per_page = max(20, min(per_page, 200))
+    # Conditional GET: one cheap aggregate stands in for the page state,
+    # so a refresh with an unchanged reports table answers 304 without
+    # re-running load_reports or rendering. Skipped while a flash
+    # message is pending, which a 304 would silently swallow.
+    etag = None
+    try:
+        with db_connection() as conn:
+            c = conn.cursor()
+            db_execute(c, 'SELECT COUNT(*), MAX(timestamp), MAX(read_at) FROM reports')
+            agg = c.fetchone() or (0, '', '')
+        etag = hashlib.md5('|'.join([
+            str(agg[0] or 0), str(agg[1] or ''), str(agg[2] or ''),
+            status_filter, user_filter, text_filter, str(page), str(per_page),
+        ]).encode('utf-8')).hexdigest()
+    except Exception as exc:
+        logging.debug("view_reports etag skipped: %s", exc)
+    if etag and '_flashes' not in session and request.if_none_match.contains(etag):
+        return app.response_class(status=304)
     reports, total_rows = load_reports(
         status_filter=status_filter,
         user_filter=user_filter,
@@ -45335,7 +45689,7 @@ def view_reports():
     total_pages = max(1, (total_rows + per_page - 1) // per_page)
     if page > total_pages:
         page = total_pages
-    return render_template(
+    resp = app.response_class(render_template(
         'super/report_viewer_reports.html',
         reports=reports,
         status_filter=status_filter,
@@ -45345,7 +45699,11 @@ def view_reports():
         per_page=per_page,
         total_pages=total_pages,
         total_rows=total_rows,
-    )
+    ))
+    if etag:
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
 
 @app.route('/super-admin/error-logs')
 def super_admin_error_logs():
@@ -45521,9 +45879,9 @@ def super_admin_system_settings():
 
 @app.route('/view-reports/mark-all-read', methods=['POST'])
 def view_reports_mark_all_read():
-    if 'user_id' not in session:
+    if not g.user_id:
         return redirect(url_for('login'))
-    if session.get('role') != 'super_admin':
+    if g.role != 'super_admin':
         flash('Only super admin can update reports.', 'error')
         return redirect(url_for('menu'))
     mark_all_reports_read()
@@ -45532,16 +45890,13 @@ def view_reports_mark_all_read():
 
 @app.route('/view-reports/mark-read', methods=['POST'])
 def view_reports_mark_read():
-    if 'user_id' not in session:
+    if not g.user_id:
         return redirect(url_for('login'))
-    if session.get('role') != 'super_admin':
+    if g.role != 'super_admin':
         flash('Only super admin can update reports.', 'error')
         return redirect(url_for('menu'))
     rid = (request.form.get('report_id', '') or '').strip()
-    try:
-        updated = mark_report_status(int(rid), 'read')
-    except Exception:
-        updated = 0
+    updated = mark_report_status(int(rid), 'read') if rid.isdecimal() else 0
     if updated:
         flash('Report marked as read.', 'success')
     else:
@@ -45550,16 +45905,13 @@ def view_reports_mark_read():
 
 @app.route('/view-reports/mark-unread', methods=['POST'])
 def view_reports_mark_unread():
-    if 'user_id' not in session:
+    if not g.user_id:
         return redirect(url_for('login'))
-    if session.get('role') != 'super_admin':
+    if g.role != 'super_admin':
         flash('Only super admin can update reports.', 'error')
         return redirect(url_for('menu'))
     rid = (request.form.get('report_id', '') or '').strip()
-    try:
-        updated = mark_report_status(int(rid), 'unread')
-    except Exception:
-        updated = 0
+    updated = mark_report_status(int(rid), 'unread') if rid.isdecimal() else 0
     if updated:
         flash('Report marked as unread.', 'success')
     else:
@@ -45568,16 +45920,13 @@ def view_reports_mark_unread():
 
 @app.route('/view-reports/delete', methods=['POST'])
 def view_reports_delete():
-    if 'user_id' not in session:
+    if not g.user_id:
         return redirect(url_for('login'))
-    if session.get('role') != 'super_admin':
+    if g.role != 'super_admin':
         flash('Only super admin can delete reports.', 'error')
         return redirect(url_for('menu'))
     rid = (request.form.get('report_id', '') or '').strip()
-    try:
-        deleted = delete_report(int(rid))
-    except Exception:
-        deleted = 0
+    deleted = delete_report(int(rid)) if rid.isdecimal() else 0
     if deleted:
         flash('Report deleted.', 'success')
     else:
@@ -45837,6 +46186,16 @@ except Exception as _prod_env_exc:
     logging.error("Production env validation failed at import: %s", _prod_env_exc)
     raise
 
+WARM_DB_POOL_ON_BOOT = os.environ.get('WARM_DB_POOL_ON_BOOT', '1').strip().lower() in ('1', 'true', 'yes')
+# Skip warm-up under pytest: the fixtures reload this module repeatedly
+# without a live database, and each import would otherwise attempt real
+# TCP connects just to log a connection-refused warning.
+if WARM_DB_POOL_ON_BOOT and 'pytest' not in sys.modules:
+    try:
+        warm_db_pool()
+    except Exception as _warm_exc:
+        logging.warning("DB pool warm-up failed: %s", _warm_exc)
+
 try:
     if _should_start_background_worker():
         start_background_worker()